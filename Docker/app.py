@@ -1,20 +1,68 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
-from typing import Dict
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Annotated, Dict, List, Optional
+import os
+import loadshed
+import memory
+import profiling
+import wire
+from ingest import json_body, openapi_body
+from models import Student
+from changefeed import ChangeFeed, sse_frame
+from persistence import WriteBehind
+from shards import ShardedStudentStore
+from store import StudentStore
+
+@asynccontextmanager
+async def lifespan(app):
+    if persistence:
+        persistence.restore()
+        persistence.start()
+    yield
+    if persistence:
+        persistence.close()
 
 # Create FastAPI app
-app = FastAPI(title="Student Admission API")
-
-# Student model
-class Student(BaseModel):
-    name: str
-    father_name: str
-    age: int
-    class_name: str
-
-# In-memory "database"
-students: Dict[int, Student] = {}
+app = FastAPI(title="Student Admission API", lifespan=lifespan)
+profiling.install(app)
+# by-name looks at every student; the change feed streams are long-lived and never shed
+loadshed.install(app, scans=["/students/by-name/{name}"], reads=["/students/batch-get"], exempt=["/students/changes", "/students/changes/stats", "/persistence/stats"])
+wire.install(app)
+
+# Body of POST /students/batch-get
+MAX_BATCH_IDS = 1000
+
+class BatchGetRequest(BaseModel):
+    ids: Annotated[List[int], Field(max_length=MAX_BATCH_IDS)]
+
+# In-memory "database" (a dict that also keeps IDs sorted for paging).
+# Every change is published to the change feed.
+# STUDENT_SHARDS=N spreads the students over N worker processes instead, so
+# scans like by-name run on N cores.
+# Changes are written to STUDENTS_DATA_DIR in the background (write-behind)
+# and restored on startup; STUDENTS_PERSIST=0 keeps the students in memory only.
+feed = ChangeFeed()
+STUDENT_SHARDS = int(os.environ.get("STUDENT_SHARDS", "1"))
+if STUDENT_SHARDS > 1:
+    students: Dict[int, Student] = ShardedStudentStore(Student, STUDENT_SHARDS)
+else:
+    students: Dict[int, Student] = StudentStore()
+
+persistence = None
+if os.environ.get("STUDENTS_PERSIST", "1") == "1":
+    persistence = WriteBehind(students, Student, os.environ.get("STUDENTS_DATA_DIR", "data"))
+
+def on_change(op, student_id, student=None):
+    feed.publish(op, student_id, student)
+    if persistence:
+        persistence.mark(student_id)
+
+students.on_change = on_change
+
+# GET /debug/memory and tracemalloc snapshots, only with MEMORY_DEBUG_ENABLED=1
+memory.install(app, {"students": students.memory_usage, "change_feed": feed.memory_usage})
 
 # HTML Frontend
 html_content = """
@@ -217,6 +265,44 @@ html_content = """
             flex-wrap: wrap;
         }
 
+        /* All Students: only the rows inside the viewport are in the DOM */
+        .list-summary {
+            margin: 15px 0;
+            color: #666;
+        }
+
+        .virtual-list {
+            height: 600px;
+            overflow-y: auto;
+            position: relative;
+            border: 2px solid #e1e5e9;
+            border-radius: 10px;
+        }
+
+        .virtual-spacer {
+            position: relative;
+        }
+
+        .virtual-row {
+            position: absolute;
+            left: 0;
+            right: 0;
+            height: 64px;
+            display: grid;
+            grid-template-columns: 80px 2fr 2fr 100px 1fr 200px;
+            align-items: center;
+            gap: 10px;
+            padding: 0 15px;
+            border-bottom: 1px solid #f0f0f0;
+            border-left: 4px solid #4facfe;
+            background: #f8f9fa;
+        }
+
+        .virtual-row .btn {
+            padding: 8px 14px;
+            font-size: 14px;
+        }
+
         .message {
             padding: 15px;
             border-radius: 8px;
@@ -376,9 +462,6 @@ html_content = """
     </div>
 
     <script>
-        // Global variables
-        let studentsData = {};
-        
         // Get the current origin for API calls
         const API_BASE = window.location.origin;
 
@@ -413,8 +496,8 @@ html_content = """
             document.getElementById(tabName).classList.add('active');
             event.target.classList.add('active');
             
-            if (tabName === 'all') {
-                loadAllStudents();
+            if (tabName === 'all' && listState === null) {
+                loadAllStudents();  // after the first load the change feed keeps the list current
             }
         }
 
@@ -444,7 +527,6 @@ html_content = """
                     const result = await response.json();
                     showMessage('add-message', 'Student added successfully!', 'success');
                     clearForm('add');
-                    studentsData[studentId] = studentData;
                 } else {
                     const error = await response.json();
                     showMessage('add-message', `Error: ${error.detail}`, 'error');
@@ -498,11 +580,36 @@ html_content = """
             }
         }
 
-        // Load all students - show the current in-memory students
+        // Load all students - pages come from GET /students as the list is
+        // scrolled, and only the rows in view (plus a few above/below) are rendered.
+        // Changes made after the first page are applied from the change feed
+        // (GET /students/changes) instead of re-fetching the list.
+        const ROW_HEIGHT = 64;
+        const PAGE_SIZE = 200;
+        const OVERSCAN = 10;
+        let listState = null;
+        let changeFeed = null;
+
+        function escapeHtml(value) {
+            return String(value).replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+        }
+
         async function loadAllStudents() {
             const container = document.getElementById('all-students');
-            
-            if (Object.keys(studentsData).length === 0) {
+            listState = { rows: [], nextCursor: null, done: false, loading: false, total: 0, frame: null, seq: null };
+            if (changeFeed) changeFeed.close();
+            changeFeed = null;
+            showLoading('all-students');
+
+            try {
+                await fetchNextPage();
+            } catch (error) {
+                container.innerHTML = `<div class="message error">Network error: ${error.message}</div>`;
+                return;
+            }
+            subscribeToChanges(listState.seq);
+
+            if (listState.rows.length === 0) {
                 container.innerHTML = `
                     <div class="message error">
                         No students found. Add some students first using the "Add Student" tab.
@@ -510,13 +617,133 @@ html_content = """
                 `;
                 return;
             }
-            
-            const students = Object.keys(studentsData).map(id => ({
-                id: id,
-                ...studentsData[id]
-            }));
-            
-            displayStudents('all-students', students);
+
+            container.innerHTML = `
+                <div class="list-summary" id="all-students-summary"></div>
+                <div class="virtual-list" id="virtual-list">
+                    <div class="virtual-spacer" id="virtual-spacer"></div>
+                </div>
+            `;
+            document.getElementById('virtual-list').addEventListener('scroll', onListScroll);
+            document.getElementById('virtual-spacer').addEventListener('click', onRowAction);
+            renderVisibleRows();
+        }
+
+        async function fetchNextPage() {
+            const state = listState;
+            if (state.loading || state.done) return;
+            state.loading = true;
+            try {
+                const params = new URLSearchParams({ limit: PAGE_SIZE });
+                if (state.nextCursor !== null) params.set('cursor', state.nextCursor);
+                const response = await fetch(`${API_BASE}/students?${params}`);
+                const page = await response.json();
+                state.rows.push(...page.items);
+                state.total = page.total;
+                if (state.seq === null) state.seq = page.seq;
+                state.nextCursor = page.next_cursor;
+                state.done = page.next_cursor === null;
+            } finally {
+                state.loading = false;
+            }
+        }
+
+        function onListScroll() {
+            // at most one render per animation frame
+            if (listState.frame) return;
+            listState.frame = requestAnimationFrame(() => {
+                listState.frame = null;
+                renderVisibleRows();
+                const list = document.getElementById('virtual-list');
+                const loadedHeight = listState.rows.length * ROW_HEIGHT;
+                if (list.scrollTop + list.clientHeight > loadedHeight - OVERSCAN * ROW_HEIGHT) {
+                    const state = listState;
+                    fetchNextPage().then(() => { if (state === listState) renderVisibleRows(); });
+                }
+            });
+        }
+
+        function subscribeToChanges(since) {
+            // On reconnect EventSource resumes from the last event id by itself
+            changeFeed = new EventSource(`${API_BASE}/students/changes?since=${since}`);
+            for (const op of ['create', 'update', 'delete']) {
+                changeFeed.addEventListener(op, e => applyChange(JSON.parse(e.data)));
+            }
+            changeFeed.addEventListener('reset', () => loadAllStudents());  // missed changes
+        }
+
+        function rowIndex(rows, id) {
+            // first row with row.id >= id (rows are in ID order)
+            let lo = 0, hi = rows.length;
+            while (lo < hi) {
+                const mid = (lo + hi) >> 1;
+                if (rows[mid].id < id) lo = mid + 1; else hi = mid;
+            }
+            return lo;
+        }
+
+        function applyChange(change) {
+            const state = listState;
+            const rows = state.rows;
+            const i = rowIndex(rows, change.id);
+            const present = i < rows.length && rows[i].id === change.id;
+            if (change.op === 'delete') {
+                if (present) rows.splice(i, 1);
+                state.total -= 1;
+            } else if (present) {
+                rows[i] = { id: change.id, ...change.student };
+            } else {
+                if (change.op === 'create') state.total += 1;
+                // IDs past the loaded pages arrive with the next page
+                if (i < rows.length || state.done) rows.splice(i, 0, { id: change.id, ...change.student });
+            }
+            if (!document.getElementById('virtual-list')) {
+                if (rows.length > 0) loadAllStudents();  // first student added to an empty list
+                return;
+            }
+            if (state.frame) return;
+            state.frame = requestAnimationFrame(() => {
+                state.frame = null;
+                renderVisibleRows();
+            });
+        }
+
+        function renderVisibleRows() {
+            const list = document.getElementById('virtual-list');
+            if (!list) return;
+            const rows = listState.rows;
+            const spacer = document.getElementById('virtual-spacer');
+            spacer.style.height = `${rows.length * ROW_HEIGHT}px`;
+
+            const first = Math.max(0, Math.floor(list.scrollTop / ROW_HEIGHT) - OVERSCAN);
+            const last = Math.min(rows.length, Math.ceil((list.scrollTop + list.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+            spacer.innerHTML = rows.slice(first, last).map((student, i) => `
+                <div class="virtual-row" style="top: ${(first + i) * ROW_HEIGHT}px">
+                    <span class="info-value">#${student.id}</span>
+                    <span class="info-value">${escapeHtml(student.name)}</span>
+                    <span class="info-value">${escapeHtml(student.father_name)}</span>
+                    <span class="info-value">${student.age} years</span>
+                    <span class="info-value">${escapeHtml(student.class_name)}</span>
+                    <span class="student-actions">
+                        <button class="btn btn-secondary" data-action="edit" data-index="${first + i}">✏️ Edit</button>
+                        <button class="btn btn-danger" data-action="delete" data-index="${first + i}">🗑️ Delete</button>
+                    </span>
+                </div>
+            `).join('');
+
+            document.getElementById('all-students-summary').textContent =
+                `Showing ${rows.length} of ${listState.total} students`;
+        }
+
+        function onRowAction(e) {
+            const button = e.target.closest('button[data-action]');
+            if (!button) return;
+            const student = listState.rows[Number(button.dataset.index)];
+            if (button.dataset.action === 'edit') {
+                editStudent(student.id, student.name, student.father_name, student.age, student.class_name);
+            } else {
+                deleteStudent(student.id);
+            }
         }
 
         // Display students
@@ -602,7 +829,6 @@ html_content = """
                 
                 if (response.ok) {
                     showMessage('update-message', 'Student updated successfully!', 'success');
-                    studentsData[studentId] = studentData;
                     setTimeout(() => {
                         cancelUpdate();
                         showTab('search');
@@ -635,9 +861,7 @@ html_content = """
                 });
                 
                 if (response.ok) {
-                    alert('Student deleted successfully!');
-                    delete studentsData[studentId];
-                    loadAllStudents();
+                    alert('Student deleted successfully!');  // the change feed removes it from the list
                 } else {
                     const error = await response.json();
                     alert(`Error: ${error.detail}`);
@@ -672,43 +896,138 @@ async def get_frontend():
 
 # API Routes (same as before)
 
+# CREATE - Add many students at once, body is {"<id>": {student}, ...}
+# Declared before /students/{student_id} so "bulk" isn't taken as an ID
+@app.post("/students/bulk", openapi_extra=openapi_body(Dict[int, Student]))
+def add_students_bulk(new_students: Dict[int, Student] = Depends(json_body(Dict[int, Student]))):
+    existing = [student_id for student_id in new_students if student_id in students]
+    if existing:
+        raise HTTPException(status_code=400, detail=f"Student IDs already exist: {existing}")
+    students.update(new_students)
+    return {"message": f"{len(new_students)} students added successfully"}
+
+# READ - Get many students by ID in one call, body is {"ids": [1, 2, 3]}
+# Declared before /students/{student_id} so "batch-get" isn't taken as an ID
+@app.post("/students/batch-get", openapi_extra=openapi_body(BatchGetRequest))
+def batch_get_students(request: BatchGetRequest = Depends(json_body(BatchGetRequest))):
+    return batch_get(request.ids)
+
+def batch_get(ids):
+    found, missing = students.get_many(dict.fromkeys(ids))  # dict.fromkeys drops duplicate IDs, keeps order
+    return {
+        "items": [{"id": student_id, **student.model_dump()} for student_id, student in found],
+        "missing": missing,
+    }
+
+# CHANGES - Stream of create/update/delete events as Server-Sent Events.
+# Each event's id is its seq; resume with since=<seq> (browsers send the
+# Last-Event-ID header on reconnect). Without either, only new changes are sent.
+# Declared before /students/{student_id} so "changes" isn't taken as an ID
+@app.get("/students/changes")
+async def student_changes(
+    since: Optional[int] = Query(None, description="Send the changes after this seq"),
+    last_event_id: Optional[int] = Header(None),
+):
+    async def stream():
+        async for event in feed.events(last_event_id if last_event_id is not None else since):
+            yield sse_frame(event)
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# CHANGES - The same events over a WebSocket, one JSON message each
+@app.websocket("/students/changes/ws")
+async def student_changes_ws(websocket: WebSocket, since: Optional[int] = None):
+    await websocket.accept()
+    try:
+        async for event in feed.events(since):
+            await websocket.send_text(event[2] if event is not None else '{"op":"keep-alive"}')
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/students/changes/stats")
+def change_feed_stats():
+    return feed.stats()
+
+# How the Bloom filter in front of the shards is doing (sharded mode only)
+@app.get("/stats/id-filter")
+def id_filter_stats():
+    if not isinstance(students, ShardedStudentStore):
+        raise HTTPException(status_code=404, detail="The ID filter is only used with STUDENT_SHARDS > 1")
+    return students.id_filter.stats()
+
+# Dirty count and flush lag of the write-behind persistence
+@app.get("/persistence/stats")
+def persistence_stats():
+    if not persistence:
+        raise HTTPException(status_code=404, detail="Persistence is disabled (STUDENTS_PERSIST=0)")
+    return persistence.stats()
+
 # CREATE - Add new student
-@app.post("/students/{student_id}")
-def add_student(student_id: int, student: Student):
+@app.post("/students/{student_id}", openapi_extra=openapi_body(Student))
+def add_student(student_id: int, student: Student = Depends(json_body(Student))):
     if student_id in students:
         raise HTTPException(status_code=400, detail="Student ID already exists")
     students[student_id] = student
     return {"message": "Student added successfully", "student": student}
 
+# READ - List students a page at a time, ordered by ID.
+# Pass the returned next_cursor as cursor to get the following page.
+# With ids=1,2,3 it returns those students instead, plus the IDs not found.
+@app.get("/students")
+def list_students(
+    cursor: Optional[int] = Query(None, description="Return students with an ID greater than this"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of students per page"),
+    ids: Optional[str] = Query(None, description="Comma separated student IDs to fetch, e.g. 1,2,3"),
+):
+    if ids is not None:
+        try:
+            id_list = [int(student_id) for student_id in ids.split(",") if student_id.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be comma separated integers")
+        if len(id_list) > MAX_BATCH_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+        return batch_get(id_list)
+
+    seq = feed.seq  # read before the page: changes after it are in the feed from since=seq
+    page, next_cursor = students.page(cursor, limit)
+    return {
+        "items": [{"id": student_id, **student.model_dump()} for student_id, student in page],
+        "next_cursor": next_cursor,
+        "total": len(students),
+        "seq": seq,
+    }
+
 # READ - Get student by ID
 @app.get("/students/{student_id}")
 def get_student(student_id: int):
-    if student_id not in students:
+    student = students.get(student_id)  # one lookup (one shard round trip in sharded mode)
+    if student is None:
         raise HTTPException(status_code=404, detail="Student not found")
-    return students[student_id]
+    return student
 
 # READ - Get student(s) by name
 @app.get("/students/by-name/{name}")
 def get_student_by_name(name: str):
-    result = [student for student in students.values() if student.name.lower() == name.lower()]
+    result = [student for _, student in students.find_by_name(name)]
     if not result:
         raise HTTPException(status_code=404, detail="No student found with that name")
     return result
 
 # UPDATE - Update student details
-@app.put("/students/{student_id}")
-def update_student(student_id: int, student: Student):
-    if student_id not in students:
+@app.put("/students/{student_id}", openapi_extra=openapi_body(Student))
+def update_student(student_id: int, student: Student = Depends(json_body(Student))):
+    if not students.replace(student_id, student):  # atomic, one shard round trip in sharded mode
         raise HTTPException(status_code=404, detail="Student not found")
-    students[student_id] = student
     return {"message": "Student updated successfully", "student": student}
 
 # DELETE - Remove student
 @app.delete("/students/{student_id}")
 def delete_student(student_id: int):
-    if student_id not in students:
+    if students.pop(student_id, None) is None:
         raise HTTPException(status_code=404, detail="Student not found")
-    del students[student_id]
     return {"message": "Student deleted successfully"}
 
 # Run the app
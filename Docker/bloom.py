@@ -0,0 +1,110 @@
+# Bloom filter over student IDs.
+#
+# Answers "is this ID stored?" with either "definitely not" or "maybe". A miss
+# is exact, so lookups of unknown IDs (typos, scrapers walking random IDs)
+# are answered without asking the store at all; a "maybe" for an ID that
+# isn't stored (a false positive) only costs the normal lookup. Sized for
+# `capacity` IDs at false positive rate `fp_rate`:
+#   bits   m = -n ln(p) / ln(2)^2
+#   hashes k = m / n ln(2)
+# positions are derived from one blake2b digest (double hashing).
+#
+# Removing an ID isn't possible; deleted IDs just stay "maybe" until the
+# owner rebuilds the filter from the current IDs.
+
+import math
+from hashlib import blake2b
+
+
+class BloomFilter:
+
+    def __init__(self, capacity, fp_rate=0.01):
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = blake2b(str(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def expected_fp_rate(self):
+        # (1 - e^(-kn/m))^k for the number of keys added so far
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class IdFilter:
+    # A BloomFilter kept in step with a store: grows by rebuilding from
+    # all_ids() when it fills up or when too many of its IDs were deleted,
+    # and counts how its answers turned out.
+
+    def __init__(self, all_ids, capacity=100000, fp_rate=0.01):
+        self.all_ids = all_ids
+        self.fp_rate = fp_rate
+        self.bloom = BloomFilter(capacity, fp_rate)
+        self.deleted = 0
+        self.rebuilds = 0
+        self.definite_misses = 0
+        self.passed = 0
+        self.false_positives = 0
+
+    def add(self, student_id):
+        if student_id in self.bloom:
+            return  # an update, or close enough (a false positive)
+        self.bloom.add(student_id)
+        if self.bloom.count > self.bloom.capacity:
+            self.rebuild()
+
+    def discard(self, student_id):
+        self.deleted += 1
+        if self.deleted > self.bloom.count // 4:
+            self.rebuild()
+
+    def rebuild(self):
+        ids = list(self.all_ids())
+        bloom = BloomFilter(max(self.bloom.capacity, 2 * len(ids)), self.fp_rate)
+        for student_id in ids:
+            bloom.add(student_id)
+        self.bloom, self.deleted = bloom, 0
+        self.rebuilds += 1
+
+    def might_contain(self, student_id):
+        if student_id in self.bloom:
+            self.passed += 1
+            return True
+        self.definite_misses += 1
+        return False
+
+    def record_false_positive(self):
+        # The store didn't have an ID the filter let through
+        self.false_positives += 1
+
+    def stats(self):
+        return {
+            'ids': self.bloom.count,
+            'capacity': self.bloom.capacity,
+            'bits': self.bloom.size,
+            'hashes': self.bloom.hashes,
+            'target_fp_rate': self.fp_rate,
+            'expected_fp_rate': round(self.bloom.expected_fp_rate(), 6),
+            'definite_misses': self.definite_misses,
+            'passed': self.passed,
+            'false_positives': self.false_positives,
+            'observed_fp_rate': round(self.false_positives / (self.false_positives + self.definite_misses), 6)
+            if self.false_positives + self.definite_misses else None,
+            'deleted_since_rebuild': self.deleted,
+            'rebuilds': self.rebuilds,
+        }
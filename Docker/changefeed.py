@@ -0,0 +1,118 @@
+# Change feed for the student store.
+#
+# Every create/update/delete gets the next sequence number and is appended to
+# a bounded in-memory log. Subscribers (SSE or WebSocket) don't get a queue of
+# their own: they remember the last seq they sent and read newer events
+# straight from the shared log. One broadcaster wakes them all by resolving a
+# single future, so an idle subscriber is just a suspended coroutine.
+#
+# Events are serialized once when published, not once per subscriber.
+#
+# A client resumes with since=<last seq it saw> (or the SSE Last-Event-ID
+# header). If those events have already dropped out of the log, or the seq is
+# from before a server restart, it gets a "reset" event and should reload.
+
+import asyncio
+import threading
+from collections import deque
+
+from memory import sequence_usage
+
+RETAINED_EVENTS = 10000
+HEARTBEAT_SECONDS = 15
+
+
+class ChangeFeed:
+
+    def __init__(self, retained=RETAINED_EVENTS):
+        self._log = deque(maxlen=retained)  # (seq, op, json)
+        self._lock = threading.Lock()
+        self.seq = 0
+        self.subscribers = 0
+        self._loop = None
+        self._wakeup = None
+        self._wakeup_pending = False
+
+    def publish(self, op, student_id, student=None):
+        # Called by the store with its lock held, possibly from a threadpool thread
+        payload = student.model_dump_json() if student is not None else 'null'
+        with self._lock:
+            self.seq += 1
+            data = f'{{"seq":{self.seq},"op":"{op}","id":{student_id},"student":{payload}}}'
+            self._log.append((self.seq, op, data))
+            if self._loop is None or self._wakeup_pending:
+                return
+            self._wakeup_pending = True  # a bulk insert wakes subscribers once
+        try:
+            self._loop.call_soon_threadsafe(self._broadcast)
+        except RuntimeError:  # loop closed
+            pass
+
+    def _broadcast(self):
+        with self._lock:
+            self._wakeup_pending = False
+        wakeup, self._wakeup = self._wakeup, self._loop.create_future()
+        wakeup.set_result(None)
+
+    def read(self, since):
+        # Events after since, oldest first, or None if some of them are gone.
+        with self._lock:
+            if since > self.seq:
+                return None  # seq from before a restart
+            if since == self.seq:
+                return []
+            if not self._log or self._log[0][0] > since + 1:
+                return None
+            events = []
+            for event in reversed(self._log):  # subscribers are usually near the tail
+                if event[0] <= since:
+                    break
+                events.append(event)
+        events.reverse()
+        return events
+
+    async def events(self, since=None):
+        # Yields (seq, op, json) events, or None as a heartbeat when nothing
+        # happened for HEARTBEAT_SECONDS.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._wakeup = loop, loop.create_future()
+        if since is None:
+            since = self.seq
+        self.subscribers += 1
+        try:
+            while True:
+                wakeup = self._wakeup
+                events = self.read(since)
+                if events is None:
+                    since = self.seq
+                    yield since, 'reset', f'{{"seq":{since},"op":"reset"}}'
+                    continue
+                for event in events:
+                    yield event
+                if events:
+                    since = events[-1][0]
+                    continue
+                try:
+                    await asyncio.wait_for(asyncio.shield(wakeup), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.subscribers -= 1
+
+    def memory_usage(self):
+        # Retained events and estimated bytes
+        with self._lock:
+            return sequence_usage(self._log)
+
+    def stats(self):
+        with self._lock:
+            oldest = self._log[0][0] if self._log else self.seq + 1
+        return {'seq': self.seq, 'oldest_seq': oldest, 'subscribers': self.subscribers}
+
+
+def sse_frame(event):
+    if event is None:
+        return b': keep-alive\n\n'
+    seq, op, data = event
+    return f'id: {seq}\nevent: {op}\ndata: {data}\n\n'.encode()
@@ -0,0 +1,86 @@
+# Request body ingest straight from the raw bytes.
+#
+# A body parameter like `student: Admission` makes FastAPI json.loads the body
+# into dicts first and then validate those dicts into the model. json_body()
+# instead hands the raw bytes to pydantic-core (model_validate_json /
+# TypeAdapter.validate_json), which parses and validates in a single pass.
+# Validation errors are still reported as the usual 422 response.
+#
+# The CPU gain is bulk-only: benchmarks/ingest.py measures a single-record
+# POST at the same cost either way (~440 us, dominated by the request
+# machinery), while a bulk body drops from ~11.8 to ~10.0 us per record. The
+# single-record write routes use json_body() too so that every write route
+# accepts MessagePack bodies and reports errors the same way, not for speed.
+#
+# A body sent with "Content-Type: application/msgpack" is unpacked and
+# validated from the Python objects instead (see wire.py).
+#
+# Usage:
+#   @app.post('/create', openapi_extra=openapi_body(Admission))
+#   def create_student(student: Admission = Depends(json_body(Admission))): ...
+
+from functools import lru_cache
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+
+from wire import MSGPACK, MSGPACK_TYPES, msgpack
+
+
+@lru_cache(maxsize=None)
+def adapter_for(type_):
+    # TypeAdapters are expensive to build, so keep one per type (e.g. List[Admission])
+    return TypeAdapter(type_)
+
+
+def validate_json(type_, body):
+    try:
+        return adapter_for(type_).validate_json(body)
+    except ValidationError as e:
+        errors = [{**error, 'loc': ('body', *error['loc'])} for error in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=body)
+
+
+def validate_msgpack(type_, body):
+    if msgpack is None:
+        raise HTTPException(status_code=415, detail='MessagePack bodies are not supported (msgpack is not installed)')
+    try:
+        data = msgpack.unpackb(body)
+    except Exception:
+        raise RequestValidationError([{'type': 'msgpack_invalid', 'loc': ('body',), 'msg': 'Invalid MessagePack body',
+                                       'input': None}], body=body)
+    try:
+        return adapter_for(type_).validate_python(data)
+    except ValidationError as e:
+        errors = [{**error, 'loc': ('body', *error['loc'])} for error in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=data)
+
+
+def json_body(type_):
+    # FastAPI dependency that validates the raw request body into type_
+    async def dependency(request: Request):
+        body = await request.body()
+        if request.headers.get('content-type', '').encode().startswith(MSGPACK_TYPES):
+            return validate_msgpack(type_, body)
+        return validate_json(type_, body)
+    return dependency
+
+
+def _inline_refs(schema, defs):
+    if isinstance(schema, dict):
+        if '$ref' in schema:
+            return _inline_refs(defs[schema['$ref'].split('/')[-1]], defs)
+        return {key: _inline_refs(value, defs) for key, value in schema.items() if key != '$defs'}
+    if isinstance(schema, list):
+        return [_inline_refs(item, defs) for item in schema]
+    return schema
+
+
+def openapi_body(type_):
+    # Request body documentation for routes using json_body(), since FastAPI
+    # can't see a body parameter on them.
+    schema = adapter_for(type_).json_schema()
+    schema = _inline_refs(schema, schema.get('$defs', {}))
+    return {'requestBody': {'required': True, 'content': {'application/json': {'schema': schema},
+                                                          MSGPACK: {'schema': schema}}}}
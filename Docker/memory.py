@@ -0,0 +1,249 @@
+# Opt-in memory accounting and tracemalloc snapshots.
+#
+# Nothing here is active unless the app is started with MEMORY_DEBUG_ENABLED=1.
+# If MEMORY_DEBUG_TOKEN is set as well, every request must carry it in the
+# X-Debug-Token header. When enabled:
+#   GET    /debug/memory                         process RSS, gc counts, live pydantic
+#                                                models per class, and records /
+#                                                estimated bytes of every structure
+#                                                the app registered
+#   POST   /debug/memory/snapshots               takes a tracemalloc snapshot (tracing
+#                                                starts on first use), returns its id
+#                                                and the top allocation sites
+#   GET    /debug/memory/snapshots/{a}/diff/{b}  allocation sites that grew the most
+#                                                from snapshot a to b ("now": a fresh one)
+#   DELETE /debug/memory/snapshots               stops tracing and drops the snapshots
+# Tracing slows down every allocation while it is on, so stop it after the
+# diff. Start the app with PYTHONTRACEMALLOC=1 to trace from the first import.
+#
+# Byte counts are estimates: a deep sys.getsizeof of up to MEMORY_SAMPLE
+# records, scaled to the record count. Objects shared by the sampled records
+# (interned strings, small ints, None) are counted once.
+#
+# Usage:
+#   MEMORY_DEBUG_ENABLED=1 uvicorn app:app
+#   curl -X POST localhost:8000/debug/memory/snapshots        -> {"id": 1, ...}
+#   ... traffic ...
+#   curl localhost:8000/debug/memory/snapshots/1/diff/now
+
+import gc
+import hmac
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+from itertools import islice
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Query
+from pydantic import BaseModel
+
+MEMORY_DEBUG_ENABLED = os.environ.get('MEMORY_DEBUG_ENABLED', '0') == '1'
+MEMORY_DEBUG_TOKEN = os.environ.get('MEMORY_DEBUG_TOKEN', '')
+MEMORY_SAMPLE = int(os.environ.get('MEMORY_SAMPLE', '1000'))
+MEMORY_TRACE_FRAMES = int(os.environ.get('MEMORY_TRACE_FRAMES', '1'))
+MAX_SNAPSHOTS = 10
+
+KEY_TYPES = ('lineno', 'filename', 'traceback')  # how tracemalloc groups allocations
+KEY_TYPE_PATTERN = '^(' + '|'.join(KEY_TYPES) + ')$'
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+# ---- size estimates ----
+
+def deep_size(obj, seen=None):
+    # sys.getsizeof of obj and of what it holds (containers, pydantic models),
+    # each object counted once; other objects are counted shallow
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return size + sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return size + sum(deep_size(item, seen) for item in obj)
+    if isinstance(obj, BaseModel):
+        for attribute in ('__dict__', '__pydantic_fields_set__', '__pydantic_extra__', '__pydantic_private__'):
+            size += deep_size(getattr(obj, attribute, None), seen)
+    return size
+
+
+def _usage(records, sampled, sampled_bytes, overhead):
+    per_record = sampled_bytes / sampled if sampled else 0
+    return {
+        'records': records,
+        'sampled': sampled,
+        'bytes_per_record': round(per_record, 1),
+        'estimated_bytes': round(overhead + per_record * records),
+    }
+
+
+def mapping_usage(mapping, overhead=0, sample=MEMORY_SAMPLE):
+    # A dict of records: its hash table plus the sampled keys and values
+    seen = set()
+    sampled = sampled_bytes = 0
+    for key, value in islice(mapping.items(), sample):
+        sampled_bytes += deep_size(key, seen) + deep_size(value, seen)
+        sampled += 1
+    return _usage(len(mapping), sampled, sampled_bytes, overhead + sys.getsizeof(mapping))
+
+
+def sequence_usage(items, overhead=0, sample=MEMORY_SAMPLE):
+    # A list / deque of records: the container plus the sampled items
+    seen = set()
+    sampled = sampled_bytes = 0
+    for item in islice(items, sample):
+        sampled_bytes += deep_size(item, seen)
+        sampled += 1
+    return _usage(len(items), sampled, sampled_bytes, overhead + sys.getsizeof(items))
+
+
+# ---- process ----
+
+def process_memory():
+    # VmRSS / VmHWM (peak) from /proc, None where that doesn't exist
+    found = {}
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    name, value = line.split(':', 1)
+                    found[name] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+    return {
+        'rss_bytes': found.get('VmRSS'),
+        'peak_rss_bytes': found.get('VmHWM'),
+        'gc_objects': len(gc.get_objects()),
+        'gc_counts': gc.get_count(),
+        'tracing': tracemalloc.is_tracing(),
+        'traced_bytes': traced[0] if traced else None,
+        'traced_peak_bytes': traced[1] if traced else None,
+    }
+
+
+def live_models():
+    # Pydantic model instances alive right now, per class (shallow: the
+    # instance and its __dict__), most numerous first
+    instances = Counter()
+    shallow_bytes = Counter()
+    for obj in gc.get_objects():
+        if isinstance(obj, BaseModel):
+            name = type(obj).__name__
+            instances[name] += 1
+            shallow_bytes[name] += sys.getsizeof(obj) + sys.getsizeof(obj.__dict__)
+    return {name: {'instances': count, 'shallow_bytes': shallow_bytes[name]}
+            for name, count in instances.most_common()}
+
+
+# ---- tracemalloc ----
+
+def _capture():
+    return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+
+class Snapshots:
+    # The last MAX_SNAPSHOTS tracemalloc snapshots, by id
+
+    def __init__(self):
+        self._snapshots = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def take(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_TRACE_FRAMES)
+        snapshot = _capture()
+        with self._lock:
+            snapshot_id, self._next_id = self._next_id, self._next_id + 1
+            self._snapshots[snapshot_id] = snapshot
+            while len(self._snapshots) > MAX_SNAPSHOTS:
+                self._snapshots.popitem(last=False)
+        return snapshot_id, snapshot
+
+    def get(self, snapshot_id):
+        if snapshot_id == 'now':
+            if not tracemalloc.is_tracing():
+                raise HTTPException(status_code=409, detail='Not tracing, take a snapshot first')
+            return _capture()  # compared once, not kept
+        with self._lock:
+            snapshot = self._snapshots.get(int(snapshot_id)) if snapshot_id.isdigit() else None
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail=f'Snapshot {snapshot_id} not found')
+        return snapshot
+
+    def ids(self):
+        with self._lock:
+            return list(self._snapshots)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+        tracemalloc.stop()
+
+
+def site(stat, key_type):
+    if key_type == 'filename':
+        return stat.traceback[0].filename
+    frames = [f'{frame.filename}:{frame.lineno}' for frame in stat.traceback]
+    return frames if key_type == 'traceback' else frames[0]
+
+
+def top_sites(snapshot, key_type, limit):
+    return [{'site': site(stat, key_type), 'bytes': stat.size, 'blocks': stat.count}
+            for stat in snapshot.statistics(key_type)[:limit]]
+
+
+def diff_sites(old, new, key_type, limit):
+    return [{'site': site(stat, key_type), 'bytes': stat.size, 'bytes_diff': stat.size_diff,
+             'blocks': stat.count, 'blocks_diff': stat.count_diff}
+            for stat in new.compare_to(old, key_type)[:limit]]
+
+
+def check_token(x_debug_token: Optional[str] = Header(None)):
+    if MEMORY_DEBUG_TOKEN and not hmac.compare_digest((x_debug_token or '').encode(), MEMORY_DEBUG_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail='Missing or wrong X-Debug-Token')
+
+
+def install(app, structures):
+    # structures: {name: callable returning that structure's usage}, called
+    # on every GET /debug/memory
+    if not MEMORY_DEBUG_ENABLED:
+        return
+    snapshots = Snapshots()
+    guard = [Depends(check_token)]
+
+    @app.get('/debug/memory', dependencies=guard, include_in_schema=False)
+    def memory_report():
+        return {
+            'process': process_memory(),
+            'structures': {name: usage() for name, usage in structures.items()},
+            'pydantic_models': live_models(),
+            'snapshots': snapshots.ids(),
+        }
+
+    @app.post('/debug/memory/snapshots', dependencies=guard, include_in_schema=False)
+    def take_snapshot(key_type: str = Query('lineno', pattern=KEY_TYPE_PATTERN),
+                      limit: int = Query(20, ge=1, le=500)):
+        snapshot_id, snapshot = snapshots.take()
+        return {'id': snapshot_id, 'traced_bytes': tracemalloc.get_traced_memory()[0],
+                'top': top_sites(snapshot, key_type, limit)}
+
+    @app.get('/debug/memory/snapshots/{old}/diff/{new}', dependencies=guard, include_in_schema=False)
+    def diff_snapshots(old: str, new: str,
+                       key_type: str = Query('lineno', pattern=KEY_TYPE_PATTERN),
+                       limit: int = Query(20, ge=1, le=500)):
+        return {'old': old, 'new': new, 'top': diff_sites(snapshots.get(old), snapshots.get(new), key_type, limit)}
+
+    @app.delete('/debug/memory/snapshots', dependencies=guard, include_in_schema=False)
+    def stop_tracing():
+        snapshots.clear()
+        return {'tracing': False}
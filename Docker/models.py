@@ -0,0 +1,11 @@
+# Student model of the API, shared with the Python client (admission_client)
+# so both sides validate the same way.
+
+from pydantic import BaseModel
+
+
+class Student(BaseModel):
+    name: str
+    father_name: str
+    age: int
+    class_name: str
@@ -0,0 +1,213 @@
+# Write-behind persistence for the student store.
+#
+# Writes only update memory and mark the student dirty; a background thread
+# writes the dirty students to disk every FLUSH_INTERVAL seconds, or sooner
+# once FLUSH_THRESHOLD students are dirty. On disk (in STUDENTS_DATA_DIR):
+#   snapshot.json         {"generation": g, "students": {id: student}}, always
+#                         replaced atomically (temp file + rename)
+#   journal-<g>.jsonl     one line per flushed change since snapshot g:
+#                         {"id": ..., "student": {...}} or {"id": ..., "student": null}
+# The journal is appended and fsynced on each flush; once it grows past
+# JOURNAL_MAX_BYTES it is compacted into snapshot g+1 and a fresh journal.
+# On startup restore() loads the snapshot, replays its journal and compacts
+# them into a new snapshot.
+#
+# A crash loses at most the changes of the last FLUSH_INTERVAL seconds.
+# stats() reports the dirty count and the flush lag (age of the oldest
+# change not on disk yet).
+
+import json
+import os
+import threading
+import time
+
+FLUSH_INTERVAL = float(os.environ.get('FLUSH_INTERVAL', '1.0'))
+FLUSH_THRESHOLD = int(os.environ.get('FLUSH_THRESHOLD', '1000'))
+JOURNAL_MAX_BYTES = int(os.environ.get('JOURNAL_MAX_BYTES', str(64 * 1024 * 1024)))
+
+
+class WriteBehind:
+
+    def __init__(self, store, model, directory, interval=FLUSH_INTERVAL, threshold=FLUSH_THRESHOLD):
+        self.store = store
+        self.model = model
+        self.directory = directory
+        self.interval = interval
+        self.threshold = threshold
+        self.generation = 0
+        self._dirty = set()
+        self._dirty_since = None  # time of the oldest unflushed change
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self.flushes = 0
+        self.records_flushed = 0
+        self.last_flush_at = None
+        self.last_flush_ms = None
+        self.last_error = None
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.directory, 'snapshot.json')
+
+    def journal_path(self, generation):
+        return os.path.join(self.directory, f'journal-{generation}.jsonl')
+
+    # ---- called by the store ----
+
+    def mark(self, student_id):
+        with self._lock:
+            if not self._dirty:
+                self._dirty_since = time.monotonic()
+            self._dirty.add(student_id)
+            if len(self._dirty) >= self.threshold:
+                self._wakeup.set()
+
+    # ---- startup / shutdown ----
+
+    def restore(self):
+        # Load the last snapshot plus its journal into the store, without
+        # publishing the students as new changes. Returns how many were loaded.
+        os.makedirs(self.directory, exist_ok=True)
+        students = {}
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self.generation = snapshot['generation']
+            students = snapshot['students']
+        except FileNotFoundError:
+            pass
+        for name in os.listdir(self.directory):  # left behind by a crash during compact()
+            if name.startswith('journal-') and name != os.path.basename(self.journal_path(self.generation)):
+                os.remove(os.path.join(self.directory, name))
+        replayed = False
+        try:
+            with open(self.journal_path(self.generation), 'r', encoding='utf-8') as f:
+                replayed = True
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line of a crash during a flush
+                    if entry['student'] is None:
+                        students.pop(str(entry['id']), None)
+                    else:
+                        students[str(entry['id'])] = entry['student']
+        except FileNotFoundError:
+            pass
+
+        on_change, self.store.on_change = self.store.on_change, None
+        try:
+            self.store.update({int(student_id): self.model.model_validate(student)
+                               for student_id, student in students.items()})
+        finally:
+            self.store.on_change = on_change
+        if replayed:
+            self.compact()  # also drops a torn last line before anything is appended after it
+        return len(students)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        # Stop the flusher and write whatever is still dirty
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:  # the students stay dirty and are retried on the next round
+                self.last_error = repr(e)
+
+    # ---- flushing ----
+
+    def _take_dirty(self):
+        # Swap out the dirty set and read those students under the store lock,
+        # so each is written as it was at one moment.
+        with self.store.lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                dirty_since, self._dirty_since = self._dirty_since, None
+            found, _ = self.store.get_many(sorted(dirty))
+        found = dict(found)
+        return dirty, dirty_since, [(student_id, found.get(student_id)) for student_id in sorted(dirty)]
+
+    def _restore_dirty(self, dirty, dirty_since):
+        with self._lock:
+            self._dirty |= dirty
+            if dirty_since is not None and (self._dirty_since is None or dirty_since < self._dirty_since):
+                self._dirty_since = dirty_since
+
+    def flush(self):
+        with self._flush_lock:
+            start = time.perf_counter()
+            dirty, dirty_since, changes = self._take_dirty()
+            if not changes:
+                return
+            try:
+                lines = ''.join(json.dumps({'id': student_id,
+                                            'student': student.model_dump() if student is not None else None}) + '\n'
+                                for student_id, student in changes)
+                with open(self.journal_path(self.generation), 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if os.path.getsize(self.journal_path(self.generation)) > JOURNAL_MAX_BYTES:
+                    self.compact()
+            except BaseException:
+                self._restore_dirty(dirty, dirty_since)
+                raise
+            self.flushes += 1
+            self.records_flushed += len(changes)
+            self.last_flush_at = time.time()
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+            self.last_error = None
+
+    def compact(self):
+        # Full snapshot as generation g+1; journal g is only removed after the
+        # new snapshot is in place, so a crash at any point restores correctly.
+        with self.store.lock:
+            items, _ = self.store.page(None, max(1, len(self.store)))
+            generation = self.generation + 1
+        body = json.dumps({'generation': generation,
+                           'students': {student_id: student.model_dump() for student_id, student in items}})
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        old_journal = self.journal_path(self.generation)
+        self.generation = generation
+        os.remove(old_journal)
+
+    def stats(self):
+        with self._lock:
+            dirty = len(self._dirty)
+            lag = time.monotonic() - self._dirty_since if self._dirty_since is not None else 0.0
+        try:
+            journal_bytes = os.path.getsize(self.journal_path(self.generation))
+        except FileNotFoundError:
+            journal_bytes = 0
+        return {
+            'dirty': dirty,
+            'flush_lag_seconds': round(lag, 3),
+            'flush_interval_seconds': self.interval,
+            'flushes': self.flushes,
+            'records_flushed': self.records_flushed,
+            'last_flush_at': self.last_flush_at,
+            'last_flush_ms': self.last_flush_ms,
+            'generation': self.generation,
+            'journal_bytes': journal_bytes,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,267 @@
+# Hash-sharded student store (STUDENT_SHARDS=N).
+#
+# One Python process can only scan the students on one core at a time. In
+# sharded mode the students are partitioned by hash(student_id) % N across N
+# worker processes, each holding a StudentStore of plain dicts:
+#   - point operations (get, set, delete) go to the one shard owning the ID
+#   - scans (find_by_name) and batch lookups are sent to all shards at once,
+#     run in parallel, and the results are merged
+#   - pages in ID order are a k-way merge of each shard's own next page
+#   - a Bloom filter over the IDs, kept in this process, answers lookups of
+#     unknown IDs without a round trip to any shard
+#
+# ShardedStudentStore has the same interface as StudentStore, so app.py uses
+# either one without changes. Workers are started on first use.
+
+import heapq
+import multiprocessing
+import os
+import sys
+import threading
+from collections.abc import MutableMapping
+
+from bloom import IdFilter
+from store import StudentStore
+
+BLOOM_FP_RATE = float(os.environ.get('BLOOM_FP_RATE', '0.01'))
+_MISSING = object()
+
+
+def _worker(conn):
+    store = StudentStore()
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:  # the server process is gone
+            return
+        op, args = request
+        try:
+            if op == 'get':
+                result = store.get(args[0])
+            elif op == 'set':
+                result = args[0] not in store
+                store[args[0]] = args[1]
+            elif op == 'set_many':
+                result = []  # created, per student
+                for student_id, student in args[0]:
+                    result.append(student_id not in store)
+                    store[student_id] = student
+            elif op == 'delete':
+                del store[args[0]]
+                result = None
+            elif op == 'replace':
+                result = store.replace(args[0], args[1])
+            elif op == 'pop':
+                result = store.pop(args[0], None)
+            elif op == 'len':
+                result = len(store)
+            elif op == 'ids':
+                result = sorted(store)
+            elif op == 'page':
+                result = store.page(*args)[0]
+            elif op == 'get_many':
+                result = store.get_many(args[0])[0]
+            elif op == 'memory_usage':
+                result = store.memory_usage()
+            elif op == 'find_by_name':
+                name = args[0].lower()
+                result = store.scan(lambda student: student['name'].lower() == name)
+            else:
+                raise ValueError(f'unknown op {op!r}')
+        except Exception as e:
+            conn.send((False, e))
+        else:
+            conn.send((True, result))
+
+
+class Shard:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()  # one request in flight per shard
+
+    def send(self, op, *args):
+        self.conn.send((op, args))
+
+    def receive(self):
+        ok, result = self.conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def call(self, op, *args):
+        with self.lock:
+            self.send(op, *args)
+            return self.receive()
+
+
+class ShardedStudentStore(MutableMapping):
+
+    def __init__(self, model, shards, on_change=None):
+        self.model = model
+        self.shard_count = shards
+        self.on_change = on_change
+        self.lock = threading.RLock()  # writes, so on_change sees them in order
+        self._shards = None
+        self.id_filter = IdFilter(lambda: iter(self), fp_rate=BLOOM_FP_RATE)
+
+    @property
+    def shards(self):
+        if self._shards is None:
+            with self.lock:
+                if self._shards is None:
+                    # spawn, not fork: the server process already runs threads
+                    context = multiprocessing.get_context('spawn')
+                    self._shards = [Shard(context) for _ in range(self.shard_count)]
+        return self._shards
+
+    def shard_of(self, student_id):
+        return self.shards[hash(student_id) % self.shard_count]
+
+    def scatter(self, op, args_per_shard=None):
+        # Runs op on every shard in parallel, returns the results in shard order.
+        # Shard locks are always taken in shard order, so scatters can't deadlock.
+        shards = self.shards
+        for shard in shards:
+            shard.lock.acquire()
+        try:
+            for i, shard in enumerate(shards):
+                shard.send(op, *(args_per_shard[i] if args_per_shard else ()))
+            return [shard.receive() for shard in shards]
+        finally:
+            for shard in shards:
+                shard.lock.release()
+
+    def _student(self, data):
+        return self.model.model_validate(data)  # faster than model_construct for these flat models
+
+    def _get(self, student_id):
+        if not self.id_filter.might_contain(student_id):
+            return None
+        data = self.shard_of(student_id).call('get', student_id)
+        if data is None:
+            self.id_filter.record_false_positive()
+        return data
+
+    def __getitem__(self, student_id):
+        data = self._get(student_id)
+        if data is None:
+            raise KeyError(student_id)
+        return self._student(data)
+
+    def __setitem__(self, student_id, student):
+        with self.lock:
+            # before the shard, so a lookup racing the write can't be told "no"
+            # by the filter (a failed write only leaves a false positive)...
+            self.id_filter.add(student_id)
+            created = self.shard_of(student_id).call('set', student_id, student.model_dump())
+            # ...and after, in case that add rebuilt the filter from the shards without it
+            self.id_filter.add(student_id)
+            if self.on_change:
+                self.on_change('create' if created else 'update', student_id, student)
+
+    def __delitem__(self, student_id):
+        with self.lock:
+            self.shard_of(student_id).call('delete', student_id)  # KeyError from the shard if missing
+            self.id_filter.discard(student_id)
+            if self.on_change:
+                self.on_change('delete', student_id)
+
+    def replace(self, student_id, student):
+        # Update only if the ID exists: one round trip to the owning shard,
+        # none if the Bloom filter rules the ID out
+        with self.lock:
+            if not self.id_filter.might_contain(student_id):
+                return False
+            if not self.shard_of(student_id).call('replace', student_id, student.model_dump()):
+                self.id_filter.record_false_positive()
+                return False
+            if self.on_change:
+                self.on_change('update', student_id, student)
+        return True
+
+    def pop(self, student_id, default=_MISSING):
+        # One round trip to the owning shard, none if the Bloom filter rules the ID out
+        with self.lock:
+            data = None
+            if self.id_filter.might_contain(student_id):
+                data = self.shard_of(student_id).call('pop', student_id)
+                if data is None:
+                    self.id_filter.record_false_positive()
+            if data is None:
+                if default is _MISSING:
+                    raise KeyError(student_id)
+                return default
+            self.id_filter.discard(student_id)
+            if self.on_change:
+                self.on_change('delete', student_id)
+        return self._student(data)
+
+    def update(self, students):
+        # One round trip per shard instead of one per student
+        batches = [[] for _ in range(self.shard_count)]
+        for student_id, student in students.items():
+            batches[hash(student_id) % self.shard_count].append((student_id, student))
+        with self.lock:
+            for student_id in students:  # before and after the shards, as in __setitem__
+                self.id_filter.add(student_id)
+            results = self.scatter('set_many', [([(student_id, student.model_dump()) for student_id, student in batch],)
+                                                for batch in batches])
+            for student_id in students:
+                self.id_filter.add(student_id)
+            if self.on_change:
+                for batch, created in zip(batches, results):
+                    for (student_id, student), was_created in zip(batch, created):
+                        self.on_change('create' if was_created else 'update', student_id, student)
+
+    def __iter__(self):
+        return heapq.merge(*self.scatter('ids'))
+
+    def __len__(self):
+        return sum(self.scatter('len'))
+
+    def __contains__(self, student_id):
+        return self._get(student_id) is not None
+
+    def page(self, cursor=None, limit=100):
+        # Each shard's first `limit` IDs after cursor, merged; one extra to know if there is more
+        pages = self.scatter('page', [(cursor, limit + 1)] * self.shard_count)
+        merged = list(heapq.merge(*pages, key=lambda item: item[0]))[:limit + 1]
+        items = [(student_id, self._student(data)) for student_id, data in merged[:limit]]
+        return items, (items[-1][0] if len(merged) > limit else None)
+
+    def get_many(self, student_ids):
+        batches = [[] for _ in range(self.shard_count)]
+        for student_id in student_ids:
+            if self.id_filter.might_contain(student_id):
+                batches[hash(student_id) % self.shard_count].append(student_id)
+        found = {}
+        if any(batches):
+            for shard_found in self.scatter('get_many', [(batch,) for batch in batches]):
+                found.update(shard_found)
+        for _ in range(sum(len(batch) for batch in batches) - len(found)):
+            self.id_filter.record_false_positive()
+        items, missing = [], []
+        for student_id in student_ids:  # back in request order
+            if student_id in found:
+                items.append((student_id, self._student(found[student_id])))
+            else:
+                missing.append(student_id)
+        return items, missing
+
+    def find_by_name(self, name):
+        matches = heapq.merge(*self.scatter('find_by_name', [(name,)] * self.shard_count), key=lambda item: item[0])
+        return [(student_id, self._student(data)) for student_id, data in matches]
+
+    def memory_usage(self):
+        # The students live in the shard processes, each reports its own part;
+        # the Bloom filter is in this process
+        shards = self.scatter('memory_usage')
+        return {
+            'records': sum(shard['records'] for shard in shards),
+            'estimated_bytes': sum(shard['estimated_bytes'] for shard in shards),
+            'shards': shards,
+            'id_filter_bytes': sys.getsizeof(self.id_filter.bloom.bits),
+        }
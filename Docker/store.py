@@ -0,0 +1,115 @@
+# In-memory student store.
+#
+# Behaves like the plain Dict[int, Student] it replaces (students[id],
+# id in students, del students[id], students.values(), ...) and additionally
+# keeps the IDs sorted, so the list endpoint can page through the students
+# with an ID cursor instead of materializing and sorting the whole store.
+#
+# on_change(op, id, student) is called for every create/update/delete while
+# the lock is held, so listeners (the change feed) see changes in store order.
+
+import sys
+import threading
+from bisect import bisect_right, insort
+from collections.abc import MutableMapping
+
+from memory import mapping_usage
+
+_MISSING = object()
+
+class StudentStore(MutableMapping):
+
+    def __init__(self, on_change=None):
+        self._students = {}
+        self._ids = []  # sorted
+        self.lock = threading.RLock()
+        self.on_change = on_change
+
+    def __getitem__(self, student_id):
+        return self._students[student_id]
+
+    def __setitem__(self, student_id, student):
+        with self.lock:
+            created = student_id not in self._students
+            if created:
+                if not self._ids or student_id > self._ids[-1]:
+                    self._ids.append(student_id)  # common case: increasing IDs
+                else:
+                    insort(self._ids, student_id)
+            self._students[student_id] = student
+            if self.on_change:
+                self.on_change('create' if created else 'update', student_id, student)
+
+    def replace(self, student_id, student):
+        # Update only if the ID exists, in one step; False if it doesn't
+        with self.lock:
+            if student_id not in self._students:
+                return False
+            self[student_id] = student
+        return True
+
+    def __delitem__(self, student_id):
+        self.pop(student_id)
+
+    def pop(self, student_id, default=_MISSING):
+        # One lookup instead of MutableMapping's self[id] followed by del self[id]
+        with self.lock:
+            student = self._students.pop(student_id, _MISSING)
+            if student is _MISSING:
+                if default is _MISSING:
+                    raise KeyError(student_id)
+                return default
+            del self._ids[bisect_right(self._ids, student_id) - 1]
+            if self.on_change:
+                self.on_change('delete', student_id)
+        return student
+
+    def __iter__(self):
+        return iter(self._students)
+
+    def __len__(self):
+        return len(self._students)
+
+    def __contains__(self, student_id):
+        return student_id in self._students
+
+    def page(self, cursor=None, limit=100):
+        # Students with an ID greater than cursor, in ID order.
+        # Returns ([(id, student), ...], next_cursor); next_cursor is None on the last page.
+        with self.lock:
+            start = 0 if cursor is None else bisect_right(self._ids, cursor)
+            ids = self._ids[start:start + limit]
+            items = [(student_id, self._students[student_id]) for student_id in ids]
+            has_more = start + limit < len(self._ids)
+        return items, (ids[-1] if has_more and ids else None)
+
+    def get_many(self, student_ids):
+        # Lookups under one lock hold, so they all see the same version of the store.
+        # Returns ([(id, student), ...], [missing ids]).
+        found, missing = [], []
+        with self.lock:
+            for student_id in student_ids:
+                student = self._students.get(student_id)
+                if student is None:
+                    missing.append(student_id)
+                else:
+                    found.append((student_id, student))
+        return found, missing
+
+    def scan(self, predicate):
+        # [(id, student), ...] for which predicate(student) is true, in ID order
+        with self.lock:
+            return [(student_id, self._students[student_id]) for student_id in self._ids
+                    if predicate(self._students[student_id])]
+
+    def find_by_name(self, name):
+        # Case-insensitive exact match, same as scan() without a call per student
+        name = name.lower()
+        with self.lock:
+            return [(student_id, self._students[student_id]) for student_id in self._ids
+                    if self._students[student_id].name.lower() == name]
+
+    def memory_usage(self):
+        # Records and estimated bytes (students, plus the sorted ID list)
+        with self.lock:
+            return mapping_usage(self._students, overhead=sys.getsizeof(self._ids))
@@ -0,0 +1,10 @@
+# The app folder isn't a package: its modules import each other by name
+# (from store import StudentStore), so tests import them the same way.
+#
+# Usage (from the Docker folder):
+#   python -m pytest tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,63 @@
+# Bloom filter over student IDs: never a false negative, and rebuilt from
+# the store's current IDs once deletes (or growth) make it stale.
+
+from bloom import BloomFilter, IdFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(1000, fp_rate=0.01)
+    for student_id in range(1000):
+        bloom.add(student_id)
+    assert all(student_id in bloom for student_id in range(1000))
+
+
+def test_false_positive_rate_near_target():
+    bloom = BloomFilter(10000, fp_rate=0.01)
+    for student_id in range(10000):
+        bloom.add(student_id)
+    false_positives = sum(student_id in bloom for student_id in range(10000, 30000))
+    assert false_positives / 20000 < 0.02
+
+
+def test_rebuild_after_deletes_forgets_deleted_ids():
+    ids = set(range(1, 201))
+    id_filter = IdFilter(lambda: iter(sorted(ids)), capacity=1000, fp_rate=1e-6)
+    for student_id in ids:
+        id_filter.add(student_id)
+
+    deleted = list(range(1, 51))
+    for student_id in deleted:  # 50 deletes: 200 // 4 = 50, not past the threshold yet
+        ids.discard(student_id)
+        id_filter.discard(student_id)
+    assert id_filter.rebuilds == 0
+    assert all(id_filter.might_contain(student_id) for student_id in deleted)  # still "maybe"
+
+    ids.discard(51)
+    id_filter.discard(51)  # the 51st delete rebuilds from the current IDs
+    assert id_filter.rebuilds == 1
+    assert id_filter.deleted == 0
+    assert id_filter.bloom.count == len(ids)
+    assert not any(id_filter.might_contain(student_id) for student_id in deleted + [51])
+    assert all(id_filter.might_contain(student_id) for student_id in ids)
+
+
+def test_rebuild_when_full_grows_capacity():
+    ids = []
+    id_filter = IdFilter(lambda: iter(ids), capacity=100)
+    for student_id in range(150):
+        ids.append(student_id)
+        id_filter.add(student_id)
+    assert id_filter.rebuilds == 1
+    assert id_filter.bloom.capacity >= 200
+    assert all(id_filter.might_contain(student_id) for student_id in ids)
+
+
+def test_stats_count_misses_and_false_positives():
+    id_filter = IdFilter(lambda: iter([]), capacity=100, fp_rate=1e-6)
+    id_filter.add(1)
+    assert id_filter.might_contain(1)
+    assert not id_filter.might_contain(2)
+    id_filter.record_false_positive()
+    stats = id_filter.stats()
+    assert (stats['passed'], stats['definite_misses'], stats['false_positives']) == (1, 1, 1)
+    assert stats['observed_fp_rate'] == 0.5
@@ -0,0 +1,113 @@
+# Change feed resume: since / Last-Event-ID pick up right after the last
+# event a client saw, and anything that can't be resumed gets a reset.
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from changefeed import ChangeFeed, sse_frame
+from models import Student
+
+
+def student(name):
+    return Student(name=name, father_name=f'{name} Sr', age=10, class_name='5')
+
+
+def take(feed, since, count):
+    # The first `count` events feed.events(since) yields, as (seq, op)
+    async def run():
+        events = feed.events(since)
+        try:
+            return [(event[0], event[1]) for event in [await events.__anext__() for _ in range(count)]]
+        finally:
+            await events.aclose()
+    return asyncio.run(run())
+
+
+def publish(feed, count, op='create'):
+    for i in range(count):
+        feed.publish(op, i + 1, student(f'S{i + 1}'))
+
+
+def test_resume_after_last_seen_seq():
+    feed = ChangeFeed()
+    publish(feed, 5)
+    assert take(feed, 2, 3) == [(3, 'create'), (4, 'create'), (5, 'create')]
+    assert take(feed, 0, 1) == [(1, 'create')]
+
+
+def test_read_up_to_date_and_gaps():
+    feed = ChangeFeed(retained=3)
+    publish(feed, 5)
+    assert feed.read(5) == []
+    assert [event[0] for event in feed.read(2)] == [3, 4, 5]
+    assert feed.read(1) is None  # seq 2 dropped out of the log
+    assert feed.read(6) is None  # from before a restart
+
+
+def test_reset_when_events_dropped_out_of_the_log():
+    feed = ChangeFeed(retained=3)
+    publish(feed, 5)
+    # seq 2 is gone: reset at the current seq, then only newer events
+    assert take(feed, 1, 1) == [(5, 'reset')]
+
+
+def test_reset_when_seq_is_from_before_a_restart():
+    feed = ChangeFeed()
+    publish(feed, 2)
+    assert take(feed, 40, 1) == [(2, 'reset')]
+
+
+def test_reset_then_new_events_continue_from_there():
+    feed = ChangeFeed(retained=2)
+    publish(feed, 4)
+
+    async def run():
+        events = feed.events(0)
+        try:
+            reset = await events.__anext__()
+            feed.publish('update', 1, student('S1'))
+            return reset[:2], (await events.__anext__())[:2]
+        finally:
+            await events.aclose()
+    assert asyncio.run(run()) == ((4, 'reset'), (5, 'update'))
+
+
+def test_sse_frame_id_is_the_seq():
+    feed = ChangeFeed()
+    feed.publish('delete', 7)
+    frame = sse_frame(feed.read(0)[0]).decode()
+    assert frame.startswith('id: 1\nevent: delete\n')
+    assert json.loads(frame.split('data: ', 1)[1]) == {'seq': 1, 'op': 'delete', 'id': 7, 'student': None}
+
+
+@pytest.fixture
+def app_module():
+    os.environ.setdefault('STUDENTS_PERSIST', '0')
+    import app
+    return app
+
+
+def frames(app_module, since=None, last_event_id=None, count=1):
+    # The first `count` SSE frames of GET /students/changes
+    async def run():
+        response = await app_module.student_changes(since=since, last_event_id=last_event_id)
+        body = response.body_iterator
+        try:
+            return [await body.__anext__() for _ in range(count)]
+        finally:
+            await body.aclose()
+    return [frame.decode().split('\n', 1)[0] for frame in asyncio.run(run())]
+
+
+def test_endpoint_resumes_from_since_or_last_event_id(app_module):
+    start = app_module.feed.seq
+    for i in range(3):
+        app_module.students[9000 + i] = student(f'S{i}')
+    assert frames(app_module, since=start + 1, count=2) == [f'id: {start + 2}', f'id: {start + 3}']
+    # Last-Event-ID (sent by browsers on reconnect) wins over since
+    assert frames(app_module, since=start, last_event_id=start + 2) == [f'id: {start + 3}']
+    # a seq from before a restart resets to the current seq
+    assert frames(app_module, last_event_id=start + 100) == [f'id: {start + 3}']
@@ -0,0 +1,136 @@
+# Crash recovery of the write-behind persistence: what restore() makes of
+# the files a crash can leave behind.
+
+import json
+import os
+
+import pytest
+
+from models import Student
+from persistence import WriteBehind
+from store import StudentStore
+
+
+def student(name, age=10):
+    return Student(name=name, father_name=f'{name} Sr', age=age, class_name='5')
+
+
+def new_persistence(directory):
+    store = StudentStore()
+    persistence = WriteBehind(store, Student, str(directory))
+    store.on_change = lambda op, student_id, student=None: persistence.mark(student_id)
+    return store, persistence
+
+
+def write_snapshot(directory, generation, students):
+    with open(os.path.join(directory, 'snapshot.json'), 'w', encoding='utf-8') as f:
+        json.dump({'generation': generation,
+                   'students': {str(i): s.model_dump() for i, s in students.items()}}, f)
+
+
+def journal_line(student_id, value):
+    return json.dumps({'id': student_id, 'student': value.model_dump() if value is not None else None}) + '\n'
+
+
+def test_flush_then_restore_round_trip(tmp_path):
+    store, persistence = new_persistence(tmp_path)
+    persistence.restore()
+    store[1] = student('Ali')
+    store[2] = student('Sara')
+    persistence.flush()
+    del store[2]
+    store[3] = student('Omar')
+    persistence.flush()
+
+    restored, persistence = new_persistence(tmp_path)
+    assert persistence.restore() == 2
+    assert dict(restored) == {1: student('Ali'), 3: student('Omar')}
+
+
+def test_replay_stops_at_torn_last_line(tmp_path):
+    write_snapshot(tmp_path, 4, {1: student('Ali')})
+    with open(tmp_path / 'journal-4.jsonl', 'w', encoding='utf-8') as f:
+        f.write(journal_line(2, student('Sara')))
+        f.write(journal_line(1, None))
+        f.write(journal_line(3, student('Omar'))[:25])  # crash in the middle of a flush
+
+    store, persistence = new_persistence(tmp_path)
+    assert persistence.restore() == 1
+    assert dict(store) == {2: student('Sara')}
+
+    # The replay was compacted into the next generation, torn line dropped
+    assert persistence.generation == 5
+    assert sorted(os.listdir(tmp_path)) == ['snapshot.json']
+    assert json.loads((tmp_path / 'snapshot.json').read_text())['generation'] == 5
+
+    # Later flushes append to a clean journal and are restored after it
+    store[4] = student('Zara')
+    persistence.flush()
+    restored, persistence = new_persistence(tmp_path)
+    assert persistence.restore() == 2
+    assert dict(restored) == {2: student('Sara'), 4: student('Zara')}
+
+
+def test_restore_without_any_files(tmp_path):
+    store, persistence = new_persistence(tmp_path / 'data')
+    assert persistence.restore() == 0
+    assert len(store) == 0
+    assert persistence.generation == 0
+
+
+def test_crash_between_snapshot_replace_and_journal_remove(tmp_path, monkeypatch):
+    store, persistence = new_persistence(tmp_path)
+    persistence.restore()
+    store[1] = student('Ali')
+    store[2] = student('Sara')
+    persistence.flush()
+    generation = persistence.generation
+
+    # compact() dies right after os.replace put the new snapshot in place
+    def crash(path):
+        raise SystemExit('crash')
+    monkeypatch.setattr(os, 'remove', crash)
+    with pytest.raises(SystemExit):
+        persistence.compact()
+    monkeypatch.undo()
+
+    # On disk: snapshot g+1 (holding everything) next to the stale journal g
+    assert json.loads((tmp_path / 'snapshot.json').read_text())['generation'] == generation + 1
+    assert (tmp_path / f'journal-{generation}.jsonl').exists()
+
+    restored, persistence = new_persistence(tmp_path)
+    assert persistence.restore() == 2
+    assert dict(restored) == {1: student('Ali'), 2: student('Sara')}
+    assert persistence.generation == generation + 1
+    assert not (tmp_path / f'journal-{generation}.jsonl').exists()
+
+
+def test_crash_before_snapshot_replace_keeps_old_generation(tmp_path, monkeypatch):
+    store, persistence = new_persistence(tmp_path)
+    persistence.restore()
+    store[1] = student('Ali')
+    persistence.flush()
+    del store[1]
+    store[2] = student('Sara')
+    persistence.flush()
+    generation = persistence.generation
+
+    # compact() dies before the rename: only a temp file is left behind
+    def crash(src, dst):
+        raise SystemExit('crash')
+    monkeypatch.setattr(os, 'replace', crash)
+    with pytest.raises(SystemExit):
+        persistence.compact()
+    monkeypatch.undo()
+
+    restored, persistence = new_persistence(tmp_path)
+    assert persistence.restore() == 1
+    assert dict(restored) == {2: student('Sara')}
+    assert persistence.generation == generation + 1
+
+
+def test_restore_does_not_mark_students_dirty(tmp_path):
+    write_snapshot(tmp_path, 0, {1: student('Ali')})
+    store, persistence = new_persistence(tmp_path)
+    persistence.restore()
+    assert persistence.stats()['dirty'] == 0
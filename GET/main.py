@@ -1,9 +1,21 @@
 # In FastAPI, GET is used to retrieve data from the server.
 
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import Response
 from typing import Optional
 import json
+import os
+import loadshed
+import profiling
+import wire
+from rank_index import RANK_FIELDS, RankIndex
+from singleflight import SingleFlight
+from student_index import StudentFileIndex
 app = FastAPI()
+profiling.install(app)
+# /view and /sort_students read the whole file, keep them from crowding out point reads
+loadshed.install(app, scans=['/view', '/sort_students'], exempt=['/coalescing'])
+wire.install(app)
 
 @app.get("/")
 def read_root():
@@ -18,20 +30,46 @@ def say_hello():
 #Endpoint with retrieve all the data from database 
 STUDENTS_FILE = "student.json"
 
+# Read-only mode (STUDENTS_MMAP=1): student.json is memory-mapped with a
+# persisted byte-offset index, so a lookup decodes only the requested record
+STUDENTS_MMAP = os.environ.get("STUDENTS_MMAP", "0") == "1"
+student_index = StudentFileIndex(STUDENTS_FILE) if STUDENTS_MMAP else None
+
+# Concurrent identical requests to /view and /sort_students share one computation
+coalescer = SingleFlight()
+
 # Function to load student data
 def load():
     with open(STUDENTS_FILE, "r", encoding="utf-8") as file:
         return json.load(file)
+
+# Version of the data: changes whenever student.json is rewritten
+def data_version():
+    stat = os.stat(STUDENTS_FILE)
+    return (stat.st_size, stat.st_mtime_ns)
+
+def json_response(content):
+    return Response(content=content, media_type="application/json")
     
     
 # Endpoint to get all students
 @app.get("/view")
 def view_students():
-    return load()
+    def render():
+        if student_index:
+            # the file already is the JSON response, no need to decode and re-encode it
+            return student_index.raw()
+        return json.dumps(load()).encode()
+    return json_response(coalescer.do(("view", data_version()), render))
 
 # Endpoint to get a student by ID by parameter
 @app.get("/students/{student_id}")
 def get_student_by_id(student_id: str):
+    if student_index:
+        student = student_index.get(student_id)
+        if student is None:
+            raise HTTPException(status_code=404, detail="Student not found")
+        return student
     students = load()
     if student_id in students:
         return students[student_id]
@@ -64,13 +102,49 @@ def sort_students(
     if order not in ["asc", "desc"]:
         raise HTTPException(status_code=400, detail="Invalid order. Choose 'asc' or 'desc'")
 
-    # Load data
-    data = load()
+    def render():
+        # Load data
+        data = load()
+
+        # Set reverse order for sorting
+        reverse_order = True if order == "desc" else False
+
+        # Sort the data
+        sorted_data = sorted(data.values(), key=lambda x: x.get(sort_by, 0), reverse=reverse_order)
 
-    # Set reverse order for sorting
-    reverse_order = True if order == "desc" else False
+        return json.dumps(sorted_data).encode()
 
-    # Sort the data
-    sorted_data = sorted(data.values(), key=lambda x: x.get(sort_by, 0), reverse=reverse_order)
+    return json_response(coalescer.do(("sort_students", sort_by, order, data_version()), render))
+
+# Rank / percentile queries, answered from sorted per-field arrays
+rank_index = RankIndex()
+
+def field_ranking(by):
+    if by not in RANK_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid field. Choose from {RANK_FIELDS}")
+    ranking = rank_index.rankings(data_version(), load)[by]
+    if not len(ranking):
+        raise HTTPException(status_code=404, detail=f"No students have a {by} value")
+    return ranking
+
+# Rank of one student, 1 = highest value
+@app.get("/students/{student_id}/rank")
+def get_student_rank(student_id: str, by: str = Query(..., description=f"Rank by one of {RANK_FIELDS}")):
+    result = field_ranking(by).rank(student_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Student not found or has no {by} value")
+    return {"student_id": student_id, "by": by, **result}
+
+# Student at the p-th percentile of a field (nearest rank)
+@app.get("/percentile")
+def get_percentile(
+    by: str = Query(..., description=f"One of {RANK_FIELDS}"),
+    p: float = Query(..., ge=0, le=100, description="Percentile between 0 and 100"),
+):
+    value, student_id = field_ranking(by).select(p)
+    return {"by": by, "p": p, "value": value, "student_id": student_id}
 
-    return sorted_data
\ No newline at end of file
+# Coalescing counters: how many computations ran vs. were shared
+@app.get("/coalescing")
+def coalescing_stats():
+    return {"executed": coalescer.executed, "shared": coalescer.shared}
\ No newline at end of file
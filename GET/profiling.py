@@ -0,0 +1,226 @@
+# Opt-in profiling for slow endpoints.
+#
+# Nothing here is active unless the app is started with PROFILING_ENABLED=1.
+# When enabled:
+#   - a single request is profiled by sending the header "X-Profile: cprofile"
+#     (or "sample"), or the query parameter ?profile=cprofile / ?profile=sample
+#       cprofile -> deterministic cProfile of the endpoint, saved as <name>.prof (pstats)
+#       sample   -> stack sampling of the endpoint thread, saved as <name>.collapsed
+#     cProfile is process-wide from Python 3.12 (it runs on sys.monitoring,
+#     which allows one profiler at a time): its profile also holds the calls
+#     other threads made meanwhile, and only one cprofile request runs at a
+#     time, others are answered 409. Use sample to see one request alone.
+#     the response carries the file name in the X-Profile-File header and the
+#     file can be downloaded from GET /debug/profiles/{name}
+#   - POST /debug/profile/sample?seconds=N samples every thread of the process
+#     for N seconds (all requests, not just one) and returns collapsed stacks,
+#     which flamegraph.pl / speedscope open directly.
+#
+# Usage:
+#   PROFILING_ENABLED=1 uvicorn main:app
+#   curl -H "X-Profile: cprofile" "localhost:8000/sort?sort_by=bmi"
+#   python -m pstats profiles/<name>.prof
+
+import contextvars
+import cProfile
+import functools
+import inspect
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from fastapi import HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from fastapi.routing import APIRoute
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+PROFILING_DIR = os.environ.get('PROFILING_DIR', 'profiles')
+SAMPLE_INTERVAL = float(os.environ.get('PROFILING_SAMPLE_INTERVAL', '0.001'))
+MAX_SAMPLE_SECONDS = 60
+
+MODES = ('cprofile', 'sample')
+
+# Set by the middleware for a request that asked to be profiled, read by the
+# endpoint wrapper (contextvars follow the request into the threadpool).
+_current_profile = contextvars.ContextVar('current_profile', default=None)
+
+# Held by the request being cProfiled, see above
+_cprofile_busy = threading.Lock()
+
+
+class Sampler:
+    # Stack sampler: a background thread that periodically records the stacks
+    # of the watched threads (or every thread) in collapsed-stack format.
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = thread_ids  # None = all threads
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RequestProfile:
+    # Profiling state of one request
+    def __init__(self, mode, name):
+        self.mode = mode
+        self.name = name
+        self.profiler = cProfile.Profile() if mode == 'cprofile' else None
+        self.sampler = Sampler(thread_ids=set()) if mode == 'sample' else None
+
+    def start(self):
+        if self.sampler:
+            self.sampler.start()
+
+    def enter_endpoint(self):
+        if self.profiler:
+            self.profiler.enable()
+        else:
+            self.sampler.thread_ids.add(threading.get_ident())
+
+    def exit_endpoint(self):
+        if self.profiler:
+            self.profiler.disable()
+        else:
+            self.sampler.thread_ids.discard(threading.get_ident())
+
+    def save(self):
+        os.makedirs(PROFILING_DIR, exist_ok=True)
+        if self.profiler:
+            self.profiler.dump_stats(os.path.join(PROFILING_DIR, self.name))
+        else:
+            self.sampler.stop()
+            with open(os.path.join(PROFILING_DIR, self.name), 'w', encoding='utf-8') as f:
+                f.write(self.sampler.collapsed())
+
+
+def profiled(endpoint):
+    # Wrap an endpoint so it runs under the request's profiler when one is set.
+    # Sync endpoints stay sync so FastAPI still runs them in the threadpool.
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            profile = _current_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            profile.enter_endpoint()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.exit_endpoint()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            profile = _current_profile.get()
+            if profile is None:
+                return endpoint(*args, **kwargs)
+            profile.enter_endpoint()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                profile.exit_endpoint()
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+
+def requested_mode(scope):
+    for key, value in scope['headers']:
+        if key == b'x-profile':
+            return value.decode('latin-1').strip().lower()
+    match = re.search(r'(?:^|&)profile=([a-z]+)', scope.get('query_string', b'').decode('latin-1'))
+    return match.group(1) if match else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = requested_mode(scope) if scope['type'] == 'http' else None
+        if mode not in MODES:
+            return await self.app(scope, receive, send)
+
+        if mode == 'cprofile' and not _cprofile_busy.acquire(blocking=False):
+            response = JSONResponse(status_code=409, content={
+                'detail': 'Another request is being cProfiled, retry later or use X-Profile: sample'})
+            return await response(scope, receive, send)
+
+        path = re.sub(r'[^A-Za-z0-9]+', '_', scope['path']).strip('_') or 'root'
+        extension = '.prof' if mode == 'cprofile' else '.collapsed'
+        profile = RequestProfile(mode, f"{int(time.time() * 1000)}-{scope['method'].lower()}-{path}{extension}")
+
+        async def send_with_header(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + [(b'x-profile-file', profile.name.encode())]
+            await send(message)
+
+        token = _current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            _current_profile.reset(token)
+            try:
+                profile.save()
+            finally:
+                if mode == 'cprofile':
+                    _cprofile_busy.release()
+
+
+def install(app):
+    # Must be called right after app = FastAPI(), before routes are declared,
+    # so every route is created with the profiling wrapper.
+    if not PROFILING_ENABLED:
+        return
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.post('/debug/profile/sample', response_class=PlainTextResponse, include_in_schema=False)
+    def sample_all_requests(seconds: float = Query(10, gt=0, le=MAX_SAMPLE_SECONDS)):
+        sampler = Sampler().start()
+        time.sleep(seconds)
+        sampler.stop()
+        name = f'{int(time.time() * 1000)}-aggregate.collapsed'
+        os.makedirs(PROFILING_DIR, exist_ok=True)
+        with open(os.path.join(PROFILING_DIR, name), 'w', encoding='utf-8') as f:
+            f.write(sampler.collapsed())
+        return PlainTextResponse(sampler.collapsed(), headers={'X-Profile-File': name})
+
+    @app.get('/debug/profiles/{name}', include_in_schema=False)
+    def download_profile(name: str):
+        path = os.path.join(PROFILING_DIR, os.path.basename(name))
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail='Profile not found')
+        return FileResponse(path)
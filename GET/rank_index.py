@@ -0,0 +1,80 @@
+# Order-statistic index for rank and percentile queries.
+#
+# For each numeric field the values are kept in one sorted array (plus the ID
+# that goes with each position), so
+#   rank of a student  -> binary search for its value      O(log n)
+#   k-th smallest      -> direct index into the array      O(1)
+# student.json is read-only for this app, so the arrays are built once per
+# version of the file (O(n log n)) and shared by every request until the file
+# changes.
+
+import math
+import threading
+from bisect import bisect_left, bisect_right
+
+RANK_FIELDS = ["cgpa", "age", "weight", "bmi"]
+
+
+def field_value(student, field):
+    if field == "bmi":
+        # student.json has no height column yet; bmi is only known for records that carry one (cm)
+        weight, height = student.get("weight"), student.get("height")
+        if not isinstance(weight, (int, float)) or not isinstance(height, (int, float)) or height <= 0:
+            return None
+        return round(weight / ((height / 100) ** 2), 2)
+    value = student.get(field)
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+class FieldRanking:
+
+    def __init__(self, students, field):
+        pairs = sorted(
+            (value, student_id)
+            for student_id, student in students.items()
+            if (value := field_value(student, field)) is not None
+        )
+        self.values = [value for value, _ in pairs]  # ascending
+        self.ids = [student_id for _, student_id in pairs]
+        self.value_of = {student_id: value for value, student_id in pairs}
+
+    def __len__(self):
+        return len(self.values)
+
+    def rank(self, student_id):
+        # 1 = highest value, ties share a rank; None if the student has no value
+        value = self.value_of.get(student_id)
+        if value is None:
+            return None
+        below = bisect_left(self.values, value)
+        above = len(self.values) - bisect_right(self.values, value)
+        return {
+            "value": value,
+            "rank": above + 1,
+            "count": len(self.values),
+            # share of students with a strictly lower value
+            "percentile": round(below / len(self.values) * 100, 2),
+        }
+
+    def select(self, p):
+        # Nearest-rank percentile: the smallest value with at least p% of students at or below it
+        k = min(len(self.values), max(1, math.ceil(p / 100 * len(self.values))))
+        return self.values[k - 1], self.ids[k - 1]
+
+
+class RankIndex:
+
+    def __init__(self, fields=RANK_FIELDS):
+        self.fields = fields
+        self._lock = threading.Lock()
+        self._version = None
+        self._rankings = None
+
+    def rankings(self, version, load):
+        # Rebuilt at most once per data version, concurrent callers wait for it
+        with self._lock:
+            if version != self._version:
+                students = load()
+                self._rankings = {field: FieldRanking(students, field) for field in self.fields}
+                self._version = version
+            return self._rankings
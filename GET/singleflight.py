@@ -0,0 +1,53 @@
+# Single-flight request coalescing.
+#
+# When many clients poll the same expensive endpoint at the same moment, every
+# threadpool worker would re-read the file, sort and serialize the same result.
+# SingleFlight.do(key, fn) lets the first caller for a key run fn while every
+# concurrent caller with the same key waits for that call and gets its result.
+# Nothing is cached afterwards: the next request after completion runs fn again.
+# Keys should contain everything the result depends on (route, normalized
+# params and the data version).
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0  # calls that actually ran fn
+        self.shared = 0    # calls that reused an in-flight result
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
@@ -0,0 +1,165 @@
+# Read-only, memory-mapped access to student.json.
+#
+# load() json-decodes the whole file for every request, even when the caller
+# wants a single student. StudentFileIndex instead mmaps the file and keeps a
+# byte-offset index of every top-level record, so a lookup decodes only the
+# bytes of that one record.
+#
+# The index is built once by scanning the file and persisted next to it
+# (student.json.idx). It is a flat array of fixed size entries sorted by ID:
+#   header: b'STUIDX01' | file size | file mtime_ns | entry count
+#   entry:  key_start | key_end | value_start | value_end   (offsets into student.json)
+# Both files are mmap-ed and looked up with a binary search, so nothing
+# proportional to the file size stays resident between requests. When
+# student.json changes (size or mtime differ) the index is rebuilt.
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from contextlib import contextmanager
+
+MAGIC = b'STUIDX01'
+HEADER = struct.Struct('<8sQQQ')
+ENTRY = struct.Struct('<QQQQ')
+
+# JSON strings and brackets; everything else (numbers, commas, whitespace) is skipped
+TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]', re.DOTALL)
+SCALAR_END = re.compile(rb'\s*[,}]')
+WHITESPACE = b' \t\r\n'
+
+
+def scan_records(data):
+    # Yield (key_start, key_end, value_start, value_end) for each top-level
+    # member of the JSON object in data.
+    depth = 0
+    key = None
+    tokens = TOKEN.finditer(data)
+    for token in tokens:
+        text = token.group()
+        if text in (b'{', b'['):
+            depth += 1
+            if depth == 2:
+                value_start = token.start()
+        elif text in (b'}', b']'):
+            depth -= 1
+            if depth == 1:
+                yield key[0], key[1], value_start, token.end()
+        elif depth == 1:
+            key = (token.start(), token.end())
+            # look past the colon: objects/arrays are closed by a bracket token
+            # above, strings are the next token, numbers/literals end at , or }
+            position = data.find(b':', token.end()) + 1
+            while data[position] in WHITESPACE:
+                position += 1
+            if data[position] == ord('"'):
+                value = next(tokens)
+                yield key[0], key[1], value.start(), value.end()
+            elif data[position] not in b'{[':
+                yield key[0], key[1], position, SCALAR_END.search(data, position).start()
+
+
+class StudentFileIndex:
+    # The mapped file and its index are published as one immutable
+    # (signature, data, index, count) state, swapped in a single assignment
+    # when the file changes. Readers hold on to the state they started with;
+    # a replaced state's mmaps are closed once its last reader is done.
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.idx'
+        self._lock = threading.Lock()
+        self._state = (None, None, None, 0)
+        self._readers = {}  # id(state) -> [state, readers]
+
+    @contextmanager
+    def _reading(self):
+        stat = os.stat(self.path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if signature != self._state[0]:
+                self._swap(self._open(signature))
+            state = self._state
+            self._readers.setdefault(id(state), [state, 0])[1] += 1
+        try:
+            yield state
+        finally:
+            with self._lock:
+                entry = self._readers[id(state)]
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._readers[id(state)]
+                    if state is not self._state:
+                        _close(state)
+
+    def _swap(self, state):
+        old, self._state = self._state, state
+        if id(old) not in self._readers:
+            _close(old)
+
+    def _open(self, signature):
+        with open(self.path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index = self._open_index(signature)
+        if index is None:
+            index = self._build_index(data, signature)
+        return signature, data, index, HEADER.unpack_from(index, 0)[3]
+
+    def _open_index(self, signature):
+        try:
+            with open(self.index_path, 'rb') as f:
+                index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        magic, size, mtime_ns, _ = HEADER.unpack_from(index, 0)
+        if magic != MAGIC or (size, mtime_ns) != signature:
+            return None
+        return index
+
+    def _build_index(self, data, signature):
+        entries = sorted(scan_records(data), key=lambda e: json.loads(data[e[0]:e[1]]))
+        buffer = bytearray(HEADER.pack(MAGIC, signature[0], signature[1], len(entries)))
+        for entry in entries:
+            buffer += ENTRY.pack(*entry)
+        try:
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(buffer)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            return bytes(buffer)  # read-only directory, keep the index in memory
+        return self._open_index(signature) or bytes(buffer)
+
+    def get(self, student_id):
+        # Binary search over the sorted entries, decoding only the probed keys
+        with self._reading() as (_, data, index, count):
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                key_start, key_end, value_start, value_end = ENTRY.unpack_from(index, HEADER.size + middle * ENTRY.size)
+                key = json.loads(data[key_start:key_end])
+                if key == student_id:
+                    return json.loads(data[value_start:value_end])
+                if key < student_id:
+                    low = middle + 1
+                else:
+                    high = middle
+        return None
+
+    def raw(self):
+        # The whole file, as-is
+        with self._reading() as (_, data, _, _):
+            return data[:]
+
+    def __len__(self):
+        with self._reading() as (_, _, _, count):
+            return count
+
+
+def _close(state):
+    # Unmaps a state's file and index (an index kept in memory is plain bytes)
+    for mapping in state[1:3]:
+        if isinstance(mapping, mmap.mmap):
+            mapping.close()
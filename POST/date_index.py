@@ -0,0 +1,59 @@
+# Sorted index over date_of_birth for range / age-band queries.
+#
+# Dates are validated and parsed once when a record is written (see
+# Admission.date_of_birth) and kept here as (date ordinal, id) pairs in one
+# sorted list, so /admissions?born_after=&born_before= is two binary searches
+# plus the slice in between instead of parsing every record's string.
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+
+from store import unwrap
+
+
+def birth_ordinal(record):
+    record = unwrap(record)
+    if record is None:
+        return None
+    try:
+        return date.fromisoformat(record.get('date_of_birth')).toordinal()
+    except (TypeError, ValueError):
+        return None  # rows written before dates were validated
+
+
+class BirthDateIndex:
+    name = 'date_of_birth'
+
+    def __init__(self):
+        self.keys = []
+
+    def rebuild(self, items):
+        self.keys = sorted(
+            (ordinal, student_id) for student_id, record in items
+            if (ordinal := birth_ordinal(record)) is not None
+        )
+
+    def update(self, student_id, old, new):
+        old_ordinal = birth_ordinal(old) if old is not None else None
+        new_ordinal = birth_ordinal(new) if new is not None else None
+        if old_ordinal == new_ordinal:
+            return
+        if old_ordinal is not None:
+            i = bisect_left(self.keys, (old_ordinal, student_id))
+            if i < len(self.keys) and self.keys[i] == (old_ordinal, student_id):
+                del self.keys[i]
+        if new_ordinal is not None:
+            insort(self.keys, (new_ordinal, student_id))
+
+    def state(self):
+        return self.keys
+
+    def restore(self, state):
+        self.keys = state
+
+    def between(self, born_after=None, born_before=None):
+        # IDs of students born strictly after born_after and strictly before
+        # born_before (either bound optional), oldest first
+        start = 0 if born_after is None else bisect_right(self.keys, (born_after.toordinal(), chr(0x10FFFF)))
+        end = len(self.keys) if born_before is None else bisect_left(self.keys, (born_before.toordinal(), ''))
+        return [student_id for _, student_id in self.keys[start:end]]
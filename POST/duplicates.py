@@ -0,0 +1,146 @@
+# Duplicate-applicant detection.
+#
+# Two tiers, both hash lookups so checking one record costs O(1) on average:
+#   exact    - normalized (first_name, last_name, father_name, date_of_birth);
+#              case, accents, punctuation and extra spaces are ignored
+#   possible - records with the same date_of_birth and the same Soundex code of
+#              last_name form a block; within a block the full names are
+#              compared with difflib, which catches typos like "Ayesha"/"Aysha".
+#              Blocks are small, so this stays cheap. Optional (fuzzy=False).
+# The report walks the hash buckets once (O(n)) instead of comparing every
+# record with every other one.
+
+import difflib
+import re
+import unicodedata
+
+from store import unwrap
+
+SIMILARITY = 0.85
+
+
+def normalize(value):
+    value = unicodedata.normalize('NFKD', str(value or '')).casefold()
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', value).split())
+
+
+def soundex(name):
+    codes = {c: str(d) for d, letters in enumerate(['aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r']) for c in letters}
+    letters = [c for c in normalize(name) if c.isalpha()]
+    if not letters:
+        return ''
+    result, last = letters[0], codes[letters[0]]
+    for c in letters[1:]:
+        code = codes[c]
+        if code != '0' and code != last:
+            result += code
+        if c not in 'hw':
+            last = code
+    return (result + '000')[:4]
+
+
+def keys_of(record):
+    # (exact key, fuzzy block key, comparable name) or None for unusable rows
+    record = unwrap(record)
+    if record is None:
+        return None
+    first, last, father = (normalize(record.get(f)) for f in ('first_name', 'last_name', 'father_name'))
+    birth = normalize(record.get('date_of_birth'))
+    return (first, last, father, birth), (birth, soundex(last)), f'{first} {last} {father}'
+
+
+class DuplicateIndex:
+    name = 'duplicates'
+
+    def __init__(self, fuzzy=True):
+        self.fuzzy = fuzzy
+        self.rebuild([])
+
+    def rebuild(self, items):
+        self.exact = {}   # exact key -> set of ids
+        self.blocks = {}  # block key -> {id: comparable name}
+        for student_id, record in items:
+            self.update(student_id, None, record)
+
+    def update(self, student_id, old, new):
+        for record, add in ((old, False), (new, True)):
+            keys = keys_of(record) if record is not None else None
+            if keys is None:
+                continue
+            exact, block, name = keys
+            if add:
+                self.exact.setdefault(exact, set()).add(student_id)
+                self.blocks.setdefault(block, {})[student_id] = name
+            else:
+                self._discard(self.exact, exact, student_id)
+                self._discard(self.blocks, block, student_id)
+
+    @staticmethod
+    def _discard(buckets, key, student_id):
+        bucket = buckets.get(key)
+        if bucket is None:
+            return
+        if isinstance(bucket, set):
+            bucket.discard(student_id)
+        else:
+            bucket.pop(student_id, None)
+        if not bucket:
+            del buckets[key]
+
+    def state(self):
+        return (self.exact, self.blocks)
+
+    def restore(self, state):
+        self.exact, self.blocks = state
+
+    def find(self, record, exclude_id=None):
+        # {'exact': [ids], 'possible': [ids]} of stored records matching record
+        keys = keys_of(record)
+        if keys is None:
+            return {'exact': [], 'possible': []}
+        exact_key, block_key, name = keys
+        exact = sorted(i for i in self.exact.get(exact_key, ()) if i != exclude_id)
+        possible = []
+        if self.fuzzy:
+            for other_id, other_name in self.blocks.get(block_key, {}).items():
+                if other_id != exclude_id and other_id not in exact and similar(name, other_name):
+                    possible.append(other_id)
+        return {'exact': exact, 'possible': sorted(possible)}
+
+    def report(self, fuzzy=None):
+        fuzzy = self.fuzzy if fuzzy is None else fuzzy
+        exact_groups = [sorted(ids) for ids in self.exact.values() if len(ids) > 1]
+        possible_groups = []
+        if fuzzy:
+            for block in self.blocks.values():
+                if len(block) < 2:
+                    continue
+                possible_groups.extend(_similar_groups(block))
+        return {'exact': sorted(exact_groups), 'possible': sorted(possible_groups)}
+
+
+def similar(a, b):
+    return a == b or difflib.SequenceMatcher(None, a, b).ratio() >= SIMILARITY
+
+
+def _similar_groups(block):
+    # Connected groups of similar names inside one block (that aren't exact copies)
+    ids = list(block)
+    parent = {i: i for i in ids}
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for x in range(len(ids)):
+        for y in range(x + 1, len(ids)):
+            a, b = block[ids[x]], block[ids[y]]
+            if a != b and similar(a, b):
+                parent[root(ids[x])] = root(ids[y])
+    groups = {}
+    for i in ids:
+        groups.setdefault(root(i), []).append(i)
+    return [sorted(group) for group in groups.values() if len(group) > 1]
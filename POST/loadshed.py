@@ -0,0 +1,214 @@
+# Admission control / load shedding.
+#
+# Sync endpoints run in a threadpool of 40 threads. Under a traffic spike the
+# excess requests used to pile up in front of it with no limit, and a few slow
+# full-data scans (/view, /sort...) could hold most of the threads while cheap
+# point reads waited behind them. This middleware caps that:
+#   - every request is put in a class: "scan" (the expensive routes passed to
+#     install()), "write" (anything but GET/HEAD, except the read-only POST
+#     routes passed to install() as reads, e.g. batch lookups) or "read" (the rest)
+#   - each class has its own concurrency limit and a bounded FIFO queue, and
+#     all classes together are capped at MAX_ACTIVE
+#   - when a slot frees up, queued reads go first, then writes, then scans
+#   - a request that finds its queue full, or waits longer than MAX_WAIT
+#     seconds, gets 503 with a Retry-After estimated from the queue length
+#     and the class's recent service time
+#
+# GET /debug/load-shedding returns queue depth, in-flight and rejection
+# counters per class. Disable it all with LOADSHED_ENABLED=0.
+#
+# Usage:
+#   app = FastAPI()
+#   loadshed.install(app, scans=['/view', '/sort'], reads=['/students/batch-get'], exempt=['/ready'])
+
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+
+from starlette.routing import compile_path
+
+LOADSHED_ENABLED = os.environ.get('LOADSHED_ENABLED', '1') == '1'
+MAX_ACTIVE = int(os.environ.get('LOADSHED_MAX_ACTIVE', '40'))  # anyio's default threadpool size
+MAX_WAIT = float(os.environ.get('LOADSHED_MAX_WAIT', '5'))
+
+# class -> (concurrency limit, queue length), in priority order
+CLASSES = {
+    'read': (MAX_ACTIVE, 400),
+    'write': (MAX_ACTIVE // 2, 200),
+    'scan': (max(1, MAX_ACTIVE // 10), 20),
+}
+
+
+class RequestClass:
+    def __init__(self, name, limit, max_queue):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiters = deque()  # futures, resolved when a slot is handed over
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.service_time = 0.01  # moving average, seconds
+
+    def retry_after(self):
+        seconds = self.service_time * (len(self.waiters) + 1) / self.limit
+        return min(30, max(1, math.ceil(seconds)))
+
+    def stats(self):
+        return {
+            'limit': self.limit,
+            'active': self.active,
+            'queued': len(self.waiters),
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'avg_service_ms': round(self.service_time * 1000, 2),
+        }
+
+
+class Overloaded(Exception):
+    def __init__(self, request_class):
+        self.request_class = request_class
+
+
+class AdmissionController:
+    # All state is touched from the event loop only, so no locks are needed.
+
+    def __init__(self, max_active=MAX_ACTIVE, classes=CLASSES):
+        self.max_active = max_active
+        self.active = 0
+        self.classes = {name: RequestClass(name, *limits) for name, limits in classes.items()}
+
+    def _can_start(self, request_class):
+        return request_class.active < request_class.limit and self.active < self.max_active
+
+    async def acquire(self, request_class):
+        if not request_class.waiters and self._can_start(request_class):
+            self._start(request_class)
+            return
+        if len(request_class.waiters) >= request_class.max_queue:
+            request_class.rejected += 1
+            raise Overloaded(request_class)
+
+        waiter = asyncio.get_running_loop().create_future()
+        request_class.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, MAX_WAIT)  # the slot is taken for us in _dispatch
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return  # the slot was handed over just as the wait timed out
+            self._discard(request_class, waiter)
+            request_class.timed_out += 1
+            raise Overloaded(request_class)
+        except asyncio.CancelledError:  # client went away while queued
+            if waiter.done() and not waiter.cancelled():
+                self.release(request_class, None)  # give back the slot handed to us
+            else:
+                self._discard(request_class, waiter)
+            raise
+
+    def _discard(self, request_class, waiter):
+        # _dispatch may already have dropped it
+        try:
+            request_class.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _start(self, request_class):
+        request_class.active += 1
+        request_class.admitted += 1
+        self.active += 1
+
+    def release(self, request_class, elapsed):
+        request_class.active -= 1
+        self.active -= 1
+        if elapsed is not None:
+            request_class.service_time += (elapsed - request_class.service_time) * 0.1
+        self._dispatch()
+
+    def _dispatch(self):
+        # Hand free slots to the waiters, highest priority class first
+        for request_class in self.classes.values():
+            while request_class.waiters and self._can_start(request_class):
+                waiter = request_class.waiters.popleft()
+                if waiter.done():
+                    continue  # timed out or cancelled, acquire() hasn't cleaned up yet
+                self._start(request_class)
+                waiter.set_result(None)
+            if self.active >= self.max_active:
+                return
+
+    def stats(self):
+        return {
+            'active': self.active,
+            'max_active': self.max_active,
+            'classes': {name: request_class.stats() for name, request_class in self.classes.items()},
+        }
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, app, controller, scans=(), reads=(), exempt=()):
+        self.app = app
+        self.controller = controller
+        self.scans = [compile_path(path)[0] for path in scans]
+        self.reads = [compile_path(path)[0] for path in reads]
+        self.exempt = [compile_path(path)[0] for path in exempt]
+
+    def classify(self, scope):
+        path = scope['path']
+        if path.startswith('/debug/') or any(regex.match(path) for regex in self.exempt):
+            return None
+        if scope['method'] not in ('GET', 'HEAD') and not any(regex.match(path) for regex in self.reads):
+            return self.controller.classes['write']
+        if any(regex.match(path) for regex in self.scans):
+            return self.controller.classes['scan']
+        return self.controller.classes['read']
+
+    async def __call__(self, scope, receive, send):
+        request_class = self.classify(scope) if scope['type'] == 'http' else None
+        if request_class is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            await self.controller.acquire(request_class)
+        except Overloaded:
+            return await self.reject(request_class, send)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(request_class, time.perf_counter() - start)
+
+    async def reject(self, request_class, send):
+        body = json.dumps({'detail': f'Server overloaded ({request_class.name} requests), retry later'}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', str(request_class.retry_after()).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def install(app, scans=(), reads=(), exempt=()):
+    # scans: path templates of the expensive routes (e.g. '/sort')
+    # reads: path templates of read-only routes called with POST (e.g. a batch
+    #        lookup that takes its IDs in the body), classed as reads, not writes
+    # exempt: path templates that are never queued or shed (health checks, streams)
+    if not LOADSHED_ENABLED:
+        return
+    controller = AdmissionController()
+    app.add_middleware(LoadSheddingMiddleware, controller=controller, scans=scans, reads=reads,
+                       exempt=exempt)
+
+    @app.get('/debug/load-shedding', include_in_schema=False)
+    async def load_shedding_stats():
+        return controller.stats()
@@ -1,61 +1,62 @@
-from fastapi import FastAPI, HTTPException, Path, Query
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field, computed_field
-from typing import Optional, Annotated, Literal
-import json
+from contextlib import asynccontextmanager
+import copy
+import os
+from datetime import date
+from fastapi import Depends, FastAPI, HTTPException, Path, Query
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Annotated
 from typing import Dict
-
-app = FastAPI()
-
-class Address(BaseModel):
-    city: Annotated[str, Field(..., description='City of the student')]
-    state: Annotated[str, Field(..., description='State of the student')]
-
-class Admission(BaseModel):
-    id: Annotated[str, Field(..., description='ID of the student')]  # Changed to str to match usage
-    first_name: Annotated[str, Field(..., description='First name of the student')]
-    last_name: Annotated[str, Field(..., description='Last name of the student')]
-    gender: Annotated[Literal['male', 'female', 'other'], Field(..., description='Gender of the student')]
-    date_of_birth: Annotated[str, Field(..., description='Date of birth of the student')]
-    class_applied: Annotated[str, Field(..., description='Class applied for')]
-    height_cm: Annotated[float, Field(..., gt=0, description='Height of the student in cm')]
-    weight_kg: Annotated[float, Field(..., gt=0, description='Weight of the student in kg')]
-    father_name: Annotated[str, Field(..., description='Father name of the student')]
-    contact_number: Annotated[str, Field(..., description='Contact number of the student')]
-    address: Address
-    status: Annotated[str, Field(..., description='Admission status of the student')]
-
-    @computed_field
-    @property
-    def bmi(self) -> float:
-        bmi = round(self.weight_kg / ((self.height_cm / 100) ** 2), 2)
-        return bmi
-    
-    @computed_field
-    @property
-    def verdict(self) -> str:
-        if self.bmi < 18.5:
-            return 'Underweight'
-        elif self.bmi < 25:
-            return 'Normal'
-        elif self.bmi < 30:
-            return 'Overweight'  # Fixed: was 'Normal' for overweight range
-        else:
-            return 'Obese'
-
-def load_data():
-    try:
-        with open('school_admission.json', 'r') as f:
-            data = json.load(f)
-        return data
-    except FileNotFoundError:
-        return {}  # Return empty dict if file doesn't exist
-    except json.JSONDecodeError:
-        return {}  # Return empty dict if JSON is invalid
-
-def save_data(data):
-    with open('school_admission.json', 'w') as f:
-        json.dump(data, f, indent=2)
+import loadshed
+import memory
+import profiling
+import wire
+from ingest import json_body, openapi_body
+from models import Admission, StudentUpdate
+from date_index import BirthDateIndex
+from duplicates import DuplicateIndex
+from offload import SortOffload
+from projection import parse_fields, project
+from stats import AdmissionStats
+from store import AdmissionStore, StoreNotReady, unwrap
+
+# Only hot admissions (HOT_STATUSES, default Pending) are kept in memory; the
+# others are read from disk when asked for. school_admission.json is still
+# written on every change and a binary snapshot is written on shutdown for fast restarts.
+HOT_STATUSES = {status.strip().lower() for status in os.environ.get('HOT_STATUSES', 'Pending').split(',')}
+TIERING_INTERVAL = float(os.environ.get('TIERING_INTERVAL', '60'))
+
+def is_hot(record):
+    record = unwrap(record)
+    return record is None or str(record.get('status', '')).lower() in HOT_STATUSES
+
+store = AdmissionStore('school_admission.json', 'school_admission.snapshot', hot=is_hot)
+stats = store.add_index(AdmissionStats())
+birth_dates = store.add_index(BirthDateIndex())
+# Same child submitted twice under different IDs; DUPLICATES_FUZZY=0 turns off the fuzzy name tier
+duplicates = store.add_index(DuplicateIndex(fuzzy=os.environ.get('DUPLICATES_FUZZY', '1') == '1'))
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load in the background so the server starts accepting connections at once,
+    # /ready reports when the data is actually there.
+    store.load_in_background()
+    migration = store.start_migration(TIERING_INTERVAL)  # moves records that stopped being hot out of memory
+    yield
+    store.stop_migration(migration)
+    sort_offload.close()
+    if store.ready:
+        store.write_snapshot()
+
+app = FastAPI(lifespan=lifespan)
+profiling.install(app)
+# Full scans of the store, kept from crowding out point reads
+loadshed.install(app, scans=['/view', '/sort', '/duplicates'], reads=['/students/batch-get'], exempt=['/ready'])
+wire.install(app)
+
+@app.exception_handler(StoreNotReady)
+def store_not_ready(request, exc):
+    return JSONResponse(status_code=503, content={'detail': str(exc)}, headers={'Retry-After': '1'})
 
 @app.get("/")
 def hello():
@@ -65,23 +66,92 @@ def hello():
 def about():
     return {'message': 'A fully functional API to manage your student admission records'}
 
+# Readiness probe: 503 until the store has finished loading
+@app.get("/ready")
+def ready():
+    if not store.ready:
+        return JSONResponse(status_code=503, content={'ready': False})
+    return {'ready': True, 'records': len(store), 'loaded_from': store.loaded_from}
+
+# ?fields= on the read endpoints: comma separated fields to return, nested
+# fields with a dot, e.g. first_name,last_name,status,bmi,address.city
+FIELDS_DESCRIPTION = 'Comma separated fields to return, e.g. first_name,status,bmi,address.city'
+
 @app.get("/view")
-def view():
-    data = load_data()
-    return data
+def view(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)):
+    spec = parse_fields(fields, Admission)
+    if spec is None:
+        # Already-encoded records are spliced together, nothing is decoded here
+        return Response(content=store.json_bytes(), media_type='application/json')
+    return {student_id: project(student, spec) for student_id, student in store.items()}
 
 @app.get("/student/{student_id}")
-def view_student(student_id: str = Path(..., description="ID of the student in the DB", example="S001")):
-    data = load_data()
+def view_student(
+    student_id: str = Path(..., description="ID of the student in the DB", example="S001"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+):
+    spec = parse_fields(fields, Admission)
+    student = store.get(student_id)
 
-    if student_id in data:
-        return data[student_id]
+    if student is not None:
+        return project(student, spec)
     raise HTTPException(status_code=404, detail="Student not found")
 
+# Dashboard aggregates, maintained on every write instead of scanning the data
+@app.get('/stats')
+def admission_stats():
+    store.wait_ready()
+    with store.lock:
+        return stats.summary()
+
+# Where the records currently live (hot in memory, cold on disk)
+@app.get('/tiers')
+def storage_tiers():
+    return store.tier_stats()
+
+# Students by date of birth range, answered from the sorted date index
+@app.get('/admissions')
+def admissions_by_birth_date(
+    born_after: Optional[date] = Query(None, description='Only students born after this date (YYYY-MM-DD)'),
+    born_before: Optional[date] = Query(None, description='Only students born before this date (YYYY-MM-DD)'),
+    limit: Optional[int] = Query(None, ge=1, description='Maximum number of students to return'),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+):
+    spec = parse_fields(fields, Admission)
+    store.wait_ready()
+    with store.lock:
+        ids = birth_dates.between(born_after, born_before)
+        total = len(ids)
+        students, _ = store.get_many(ids[:limit])
+    return {'total': total, 'students': {student_id: project(student, spec) for student_id, student in students.items()}}
+
+# Multi-get: many students by ID in one call, all read from the same store version
+MAX_BATCH_IDS = 1000
+
+class BatchGetRequest(BaseModel):
+    ids: Annotated[List[str], Field(..., max_length=MAX_BATCH_IDS, description='IDs of the students')]
+
+def batch_get(ids):
+    students, missing = store.get_many(dict.fromkeys(ids))  # dict.fromkeys drops duplicate IDs, keeps order
+    return {'students': students, 'missing': missing}
+
+@app.get('/students')
+def view_students(ids: str = Query(..., description='Comma separated IDs of the students, e.g. 1,2,3')):
+    id_list = [student_id.strip() for student_id in ids.split(',') if student_id.strip()]
+    if len(id_list) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f'At most {MAX_BATCH_IDS} ids per request')
+    return batch_get(id_list)
+
+@app.post('/students/batch-get', openapi_extra=openapi_body(BatchGetRequest))
+def batch_get_students(request: BatchGetRequest = Depends(json_body(BatchGetRequest))):
+    return batch_get(request.ids)
+
 @app.get('/sort')
 def sort_student(
+    response: Response,
     sort_by: str = Query(..., description='Sort on the basis of height_cm, weight_kg or bmi'), 
-    order: str = Query('asc', description='sort in asc or desc order')
+    order: str = Query('asc', description='sort in asc or desc order'),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
 ):
     valid_fields = ['height_cm', 'weight_kg', 'bmi']  # Fixed field names to match model
 
@@ -91,16 +161,25 @@ def sort_student(
     if order not in ['asc', 'desc']:
         raise HTTPException(status_code=400, detail='Invalid order select between asc and desc')
     
-    data = load_data()
+    # bmi / verdict are only computed when requested (or sorted on)
+    spec = parse_fields(fields, Admission)
+    if spec is not None:
+        spec['id'] = True
 
-    if not data:
+    if not len(store):
         return []
 
     sort_order = True if order == 'desc' else False
 
+    # Big datasets are sorted in a worker process so this one stays responsive
+    if sort_offload.wanted():
+        body, skipped = sort_offload.sort(sort_by, sort_order, spec)
+        return Response(content=body, media_type='application/json', headers=skipped_headers(skipped))
+
     # Create Admission objects to access computed fields like bmi
     students_list = []
-    for student_id, student_data in data.items():
+    skipped = []
+    for student_id, student_data in store.items():
         try:
             # Add the id back to the data for proper object creation
             student_data_with_id = {**student_data, 'id': student_id}
@@ -114,104 +193,190 @@ def sort_student(
             
             students_list.append({
                 'student_id': student_id,
-                'data': admission.model_dump(),
+                'data': admission.model_dump(include=spec),
                 'sort_value': sort_value
             })
         except Exception as e:
-            # Skip invalid records
+            # Invalid records can't be sorted, they are listed in the X-Skipped-* headers
+            skipped.append(student_id)
             continue
 
     sorted_data = sorted(students_list, key=lambda x: x['sort_value'], reverse=sort_order)
-    
+    response.headers.update(skipped_headers(skipped))
+
     # Return just the student data
     return [item['data'] for item in sorted_data]
 
-@app.post('/create')
-def create_student(student: Admission):  # Fixed: was 'Patient' instead of 'Admission'
-    # load existing data
-    data = load_data()
-
-    # check if the student already exists
-    if student.id in data:
-        raise HTTPException(status_code=400, detail='Student already exists')
+# Records /sort left out because they aren't valid admissions (see migrate.py)
+MAX_SKIPPED_IDS = 100
 
-    # new student add to the database
-    data[student.id] = student.model_dump(exclude=['id'])
+def skipped_headers(skipped):
+    if not skipped:
+        return {}
+    return {'X-Skipped-Records': str(len(skipped)), 'X-Skipped-Ids': ','.join(skipped[:MAX_SKIPPED_IDS])}
 
-    # save into the json file
-    save_data(data)
+sort_offload = SortOffload(store, Admission)
 
-    return JSONResponse(status_code=201, content={'message': 'Student created successfully'})
+# GET /debug/memory and tracemalloc snapshots, only with MEMORY_DEBUG_ENABLED=1
+memory.install(app, {'store': store.memory_usage, 'sort_offload': sort_offload.memory_usage})
 
+ALLOW_DUPLICATE_DESCRIPTION = 'Create even if the same applicant (name, father name, date of birth) already exists'
 
+@app.post('/create', openapi_extra=openapi_body(Admission))
+def create_student(
+    student: Admission = Depends(json_body(Admission)),  # Fixed: was 'Patient' instead of 'Admission'
+    allow_duplicate: bool = Query(False, description=ALLOW_DUPLICATE_DESCRIPTION),
+):
+    record = student.model_dump(exclude=['id'])
+
+    with store.lock:
+        # check if the student already exists
+        if student.id in store:
+            raise HTTPException(status_code=400, detail='Student already exists')
+
+        # check if the same applicant was already submitted under another ID
+        matches = duplicates.find(record)
+        if matches['exact'] and not allow_duplicate:
+            raise HTTPException(status_code=409, detail={'message': 'Duplicate applicant', 'duplicate_of': matches['exact']})
+
+        # new student add to the database
+        store.put(student.id, record)
+
+        # save into the json file
+        store.save()
+
+    content = {'message': 'Student created successfully'}
+    if matches['possible']:
+        content['possible_duplicates'] = matches['possible']
+    return JSONResponse(status_code=201, content=content)
+
+# Bulk ingest: the whole list is validated in one pass by a cached TypeAdapter
+# and written with a single save, either all records are created or none.
+@app.post('/create/bulk', openapi_extra=openapi_body(List[Admission]))
+def create_students_bulk(
+    students: List[Admission] = Depends(json_body(List[Admission])),
+    allow_duplicate: bool = Query(False, description=ALLOW_DUPLICATE_DESCRIPTION),
+):
+    ids = [student.id for student in students]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail='Duplicate IDs in request')
+
+    records = {student.id: student.model_dump(exclude=['id']) for student in students}
+
+    # same applicant twice inside the batch: each record is checked against the
+    # ones before it, both tiers, so the batch reports what one /create per
+    # record would
+    batch = DuplicateIndex(fuzzy=duplicates.fuzzy)
+    duplicate_of = {}
+    possible = {}
+    for student_id, record in records.items():
+        matches = batch.find(record)
+        if matches['exact']:
+            duplicate_of[student_id] = matches['exact']
+        if matches['possible']:
+            possible[student_id] = matches['possible']
+        batch.update(student_id, None, record)
+
+    with store.lock:
+        existing = [student_id for student_id in ids if student_id in store]
+        if existing:
+            raise HTTPException(status_code=400, detail=f'Students already exist: {existing}')
+
+        # same applicant already stored
+        for student_id, record in records.items():
+            matches = duplicates.find(record)
+            if matches['exact']:
+                duplicate_of[student_id] = matches['exact'] + duplicate_of.get(student_id, [])
+            if matches['possible']:
+                possible[student_id] = matches['possible'] + possible.get(student_id, [])
+        if duplicate_of and not allow_duplicate:
+            raise HTTPException(status_code=409, detail={'message': 'Duplicate applicants', 'duplicate_of': duplicate_of})
+
+        store.put_many(records)
+
+        store.save()
+
+    content = {'message': f'{len(students)} students created successfully'}
+    if possible:
+        content['possible_duplicates'] = possible
+    return JSONResponse(status_code=201, content=content)
+
+# Groups of records that look like the same applicant, from the hash buckets (O(n))
+@app.get('/duplicates')
+def duplicate_report(fuzzy: Optional[bool] = Query(None, description='Include similar-name matches (default: server setting)')):
+    store.wait_ready()
+    with store.lock:
+        return duplicates.report(fuzzy)
+
+
+
+@app.put('/edit/{student_id}', openapi_extra=openapi_body(StudentUpdate))
+def update_student(student_id: str, student_update: StudentUpdate = Depends(json_body(StudentUpdate))):
+    # The read, merge and write happen under the store lock, so concurrent edits
+    # don't lose updates and an edit racing a delete can't bring the record back
+    with store.lock:
+        existing_student_info = store.get(student_id)
+
+        if existing_student_info is None:
+            raise HTTPException(status_code=404, detail='Student not found')
+
+        if not isinstance(existing_student_info, dict):
+            raise HTTPException(status_code=422, detail='Stored record is not in the admission format, run migrate.py')
+
+        # work on a copy, the stored record is shared with concurrent readers
+        existing_student_info = copy.deepcopy(existing_student_info)
+
+        updated_student_info = student_update.model_dump(exclude_unset=True)
+
+        # Handle address updates separately
+        address_updates = {}
+        if 'city' in updated_student_info:
+            address_updates['city'] = updated_student_info.pop('city')
+        if 'state' in updated_student_info:
+            address_updates['state'] = updated_student_info.pop('state')
+
+        # Update the main student info
+        for key, value in updated_student_info.items():
+            existing_student_info[key] = value
+
+        # Update address if needed
+        if address_updates:
+            if 'address' not in existing_student_info:
+                existing_student_info['address'] = {}
+            existing_student_info['address'].update(address_updates)
+
+        # Create pydantic object to recalculate BMI and verdict
+        existing_student_info['id'] = student_id
+        try:
+            student_pydantic_obj = Admission(**existing_student_info)
+        except ValidationError as e:
+            # The stored record itself doesn't validate (e.g. a date_of_birth from
+            # before dates were checked); the update has to correct those fields
+            fields = sorted({'.'.join(map(str, error['loc'])) for error in e.errors()})
+            raise HTTPException(status_code=422, detail={
+                'message': f'Stored record has invalid fields, include corrected values for: {", ".join(fields)}',
+                'fields': fields,
+                'errors': e.errors(include_url=False, include_context=False, include_input=False),
+            })
 
+        # Convert back to dict and remove id
+        existing_student_info = student_pydantic_obj.model_dump(exclude=['id'])
 
-class StudentUpdate(BaseModel):
-    first_name: Annotated[Optional[str], Field(default=None, description='First name of the student')]
-    last_name: Annotated[Optional[str], Field(default=None, description='Last name of the student')]
-    gender: Annotated[Optional[Literal['male', 'female', 'other']], Field(default=None, description='Gender of the student')]
-    date_of_birth: Annotated[Optional[str], Field(default=None, description='Date of birth of the student')]
-    class_applied: Annotated[Optional[str], Field(default=None, description='Class applied for')]
-    height_cm: Annotated[Optional[float], Field(default=None, gt=0, description='Height of the student in cm')]
-    weight_kg: Annotated[Optional[float], Field(default=None, gt=0, description='Weight of the student in kg')]
-    father_name: Annotated[Optional[str], Field(default=None, description='Father name of the student')]
-    contact_number: Annotated[Optional[str], Field(default=None, description='Contact number of the student')]
-    city: Annotated[Optional[str], Field(default=None, description='City of the student')]
-    state: Annotated[Optional[str], Field(default=None, description='State of the student')]
-    status: Annotated[Optional[str], Field(default=None, description='Admission status of the student')]
-
-@app.put('/edit/{student_id}')
-def update_student(student_id: str, student_update: StudentUpdate):
-    data = load_data()
-
-    if student_id not in data:
-        raise HTTPException(status_code=404, detail='Student not found')
-    
-    existing_student_info = data[student_id]
-
-    updated_student_info = student_update.model_dump(exclude_unset=True)
-
-    # Handle address updates separately
-    address_updates = {}
-    if 'city' in updated_student_info:
-        address_updates['city'] = updated_student_info.pop('city')
-    if 'state' in updated_student_info:
-        address_updates['state'] = updated_student_info.pop('state')
-
-    # Update the main student info
-    for key, value in updated_student_info.items():
-        existing_student_info[key] = value
-
-    # Update address if needed
-    if address_updates:
-        if 'address' not in existing_student_info:
-            existing_student_info['address'] = {}
-        existing_student_info['address'].update(address_updates)
-
-    # Create pydantic object to recalculate BMI and verdict
-    existing_student_info['id'] = student_id
-    student_pydantic_obj = Admission(**existing_student_info)
-    
-    # Convert back to dict and remove id
-    existing_student_info = student_pydantic_obj.model_dump(exclude=['id'])
-
-    # Save updated data
-    data[student_id] = existing_student_info
+        # Save updated data
+        store.put(student_id, existing_student_info)
 
-    save_data(data)
+        store.save()
 
     return JSONResponse(status_code=200, content={'message': 'Student updated successfully'})
 
 @app.delete('/delete/{student_id}')
 def delete_student(student_id: str):
-    # load data
-    data = load_data()
+    with store.lock:
+        if student_id not in store:
+            raise HTTPException(status_code=404, detail='Student not found')
 
-    if student_id not in data:
-        raise HTTPException(status_code=404, detail='Student not found')
-    
-    del data[student_id]
+        store.delete(student_id)
 
-    save_data(data)
+        store.save()
 
     return JSONResponse(status_code=200, content={'message': 'Student deleted successfully'})
\ No newline at end of file
@@ -0,0 +1,213 @@
+# One-off migration of school_admission.json to the canonical record format.
+#
+# Rows written by older versions of the app don't match Admission: they are
+# wrapped in a one-element list, carry an integer "id" of their own and a
+# capitalized gender ("Male"). Every /sort then pays a failed validation for
+# each of them and leaves them out. This job rewrites the file once so every
+# row is what the app itself stores: the flat, validated Admission without its
+# id, computed fields included, encoded like store.json_bytes().
+#
+# A row is fixed by unwrapping the list, dropping an "id" that matches its key
+# and lowercasing gender; anything else that fails validation (missing fields,
+# a bad date, an "id" that doesn't match its key...) is unfixable and is
+# reported. Unfixable rows are kept as they are, or moved to --rejects.
+#
+# The file is streamed: records are decoded and written one at a time, so
+# memory doesn't grow with the file. The new file is written next to it and
+# renamed over it; the original is kept as <file>.bak. Run it with the app
+# stopped, the app rewrites the whole file on every write.
+#
+# Usage:
+#   python migrate.py --check                # report only, exit code 1 if rows would change
+#   python migrate.py                        # migrate school_admission.json
+#   python migrate.py --path other.json --rejects rejects.json --report report.json
+
+import argparse
+import json
+import os
+import shutil
+import sys
+from collections import Counter
+
+from pydantic import ValidationError
+
+from models import Admission
+from store import encode
+
+CHUNK_SIZE = 1 << 20
+_decoder = json.JSONDecoder()
+
+
+class Reader:
+    # (key, value) pairs of a file holding one JSON object, decoded one value at a time
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _more(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _next_char(self):
+        # First non-whitespace character, left in the buffer
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._more():
+                raise ValueError('Unexpected end of file')
+
+    def _expect(self, chars):
+        char = self._next_char()
+        if char not in chars:
+            raise ValueError(f'Expected {chars!r} at offset {self.pos}, found {char!r}')
+        self.pos += 1
+        return char
+
+    def _value(self):
+        self._next_char()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # a value touching the end of the buffer may be cut short (a number)
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._more()
+
+    def __iter__(self):
+        self._expect('{')
+        if self._next_char() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            yield key, self._value()
+            if self._expect(',}') == '}':
+                return
+
+
+def normalize(key, value):
+    # (record in the canonical format, [fixes applied]); ValueError if unfixable
+    fixes = []
+    if isinstance(value, list):
+        if len(value) != 1:
+            raise ValueError(f'list of {len(value)} records')
+        value = value[0]
+        fixes.append('unwrapped')
+    if not isinstance(value, dict):
+        raise ValueError(f'{type(value).__name__} instead of a record')
+    record = dict(value)
+    if 'id' in record:
+        if str(record['id']) != key:
+            raise ValueError(f'id {record["id"]!r} does not match its key')
+        del record['id']
+        fixes.append('dropped_id')
+    if isinstance(record.get('gender'), str) and record['gender'] != record['gender'].strip().lower():
+        record['gender'] = record['gender'].strip().lower()
+        fixes.append('lowercased_gender')
+    try:
+        canonical = Admission.model_validate({**record, 'id': key}).model_dump(exclude={'id'})
+    except ValidationError as e:
+        raise ValueError('; '.join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+    if canonical != record:
+        fixes.append('revalidated')  # normalized date, computed fields added or refreshed, ...
+    return canonical, fixes
+
+
+def migrate(path, check=False, rejects_path=None):
+    counts = Counter()
+    fixes = Counter()
+    unfixable = {}
+    tmp_path = path + '.tmp'
+    out = rejects = None
+    first = {'out': True, 'rejects': True}
+
+    def write(f, name, key, blob):
+        f.write(b'{\n' if first[name] else b',\n')
+        first[name] = False
+        f.write(b'%s:%s' % (encode(key), blob))
+
+    try:
+        if not check:
+            out = open(tmp_path, 'wb')
+            if rejects_path:
+                rejects = open(rejects_path, 'wb')
+        with open(path, 'r', encoding='utf-8') as f:
+            for key, value in Reader(f):
+                counts['records'] += 1
+                try:
+                    record, applied = normalize(key, value)
+                except ValueError as e:
+                    counts['unfixable'] += 1
+                    unfixable[key] = str(e)
+                    if rejects:
+                        write(rejects, 'rejects', key, encode(value))
+                    elif out:
+                        write(out, 'out', key, encode(value))
+                    continue
+                counts['normalized' if applied else 'canonical'] += 1
+                fixes.update(applied)
+                if out:
+                    write(out, 'out', key, encode(record))
+        for f, name in ((out, 'out'), (rejects, 'rejects')):
+            if f:
+                f.write(b'{}' if first[name] else b'\n}')
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        if out:
+            out.close()
+            os.remove(tmp_path)
+        raise
+    finally:
+        if out and not out.closed:
+            out.close()
+        if rejects:
+            rejects.close()
+
+    if out:
+        backup = path + '.bak'
+        if os.path.exists(backup):
+            os.remove(backup)
+        try:
+            os.link(path, backup)
+        except OSError:
+            shutil.copyfile(path, backup)
+        os.replace(tmp_path, path)
+    return {'path': path, 'written': not check, **{name: counts[name] for name in
+            ('records', 'canonical', 'normalized', 'unfixable')}, 'fixes': dict(fixes), 'unfixable_rows': unfixable}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalize school_admission.json to the canonical record format')
+    parser.add_argument('--path', default='school_admission.json')
+    parser.add_argument('--check', action='store_true', help='only report, exit code 1 if rows would change')
+    parser.add_argument('--rejects', help='move unfixable rows to this file instead of keeping them')
+    parser.add_argument('--report', help='optional path to save the report as JSON')
+    args = parser.parse_args()
+
+    report = migrate(args.path, check=args.check, rejects_path=args.rejects)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.check and (report['normalized'] or report['unfixable']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# Request and record models of the admission API, shared with the Python
+# client (admission_client) so both sides validate the same way.
+
+from datetime import date
+from typing import Annotated, Literal, Optional
+
+from pydantic import BaseModel, Field, computed_field, field_validator
+
+
+class Address(BaseModel):
+    city: Annotated[str, Field(..., description='City of the student')]
+    state: Annotated[str, Field(..., description='State of the student')]
+
+def check_date_of_birth(value):
+    # Dates are parsed once at write time, so bad ones are rejected here and
+    # never show up later while scanning; stored normalized as YYYY-MM-DD
+    if value is None:
+        return value
+    try:
+        parsed = date.fromisoformat(value)
+    except ValueError:
+        raise ValueError('date_of_birth must be a valid date in YYYY-MM-DD format')
+    if parsed > date.today():
+        raise ValueError('date_of_birth cannot be in the future')
+    return parsed.isoformat()
+
+class Admission(BaseModel):
+    id: Annotated[str, Field(..., description='ID of the student')]  # Changed to str to match usage
+    first_name: Annotated[str, Field(..., description='First name of the student')]
+    last_name: Annotated[str, Field(..., description='Last name of the student')]
+    gender: Annotated[Literal['male', 'female', 'other'], Field(..., description='Gender of the student')]
+    date_of_birth: Annotated[str, Field(..., description='Date of birth of the student')]
+    class_applied: Annotated[str, Field(..., description='Class applied for')]
+    height_cm: Annotated[float, Field(..., gt=0, description='Height of the student in cm')]
+    weight_kg: Annotated[float, Field(..., gt=0, description='Weight of the student in kg')]
+    father_name: Annotated[str, Field(..., description='Father name of the student')]
+    contact_number: Annotated[str, Field(..., description='Contact number of the student')]
+    address: Address
+    status: Annotated[str, Field(..., description='Admission status of the student')]
+
+    @field_validator('date_of_birth')
+    @classmethod
+    def validate_date_of_birth(cls, value):
+        return check_date_of_birth(value)
+
+    @computed_field
+    @property
+    def bmi(self) -> float:
+        bmi = round(self.weight_kg / ((self.height_cm / 100) ** 2), 2)
+        return bmi
+    
+    @computed_field
+    @property
+    def verdict(self) -> str:
+        if self.bmi < 18.5:
+            return 'Underweight'
+        elif self.bmi < 25:
+            return 'Normal'
+        elif self.bmi < 30:
+            return 'Overweight'  # Fixed: was 'Normal' for overweight range
+        else:
+            return 'Obese'
+
+
+class StudentUpdate(BaseModel):
+    first_name: Annotated[Optional[str], Field(default=None, description='First name of the student')]
+    last_name: Annotated[Optional[str], Field(default=None, description='Last name of the student')]
+    gender: Annotated[Optional[Literal['male', 'female', 'other']], Field(default=None, description='Gender of the student')]
+    date_of_birth: Annotated[Optional[str], Field(default=None, description='Date of birth of the student')]
+    class_applied: Annotated[Optional[str], Field(default=None, description='Class applied for')]
+    height_cm: Annotated[Optional[float], Field(default=None, gt=0, description='Height of the student in cm')]
+    weight_kg: Annotated[Optional[float], Field(default=None, gt=0, description='Weight of the student in kg')]
+    father_name: Annotated[Optional[str], Field(default=None, description='Father name of the student')]
+    contact_number: Annotated[Optional[str], Field(default=None, description='Contact number of the student')]
+    city: Annotated[Optional[str], Field(default=None, description='City of the student')]
+    state: Annotated[Optional[str], Field(default=None, description='State of the student')]
+    status: Annotated[Optional[str], Field(default=None, description='Admission status of the student')]
+
+    @field_validator('date_of_birth')
+    @classmethod
+    def validate_date_of_birth(cls, value):
+        return check_date_of_birth(value)
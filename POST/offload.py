@@ -0,0 +1,151 @@
+# Process-pool offload for /sort on big datasets.
+#
+# Sorting builds an Admission model for every record, which holds the GIL for
+# the whole request and stalls every other request of the server. Once the
+# store has SORT_OFFLOAD_MIN_RECORDS records, /sort runs in a pool of worker
+# processes instead:
+#   - the records are put in a shared memory segment once per store version
+#     (the same JSON the store writes to disk)
+#   - a worker decodes that snapshot the first time it sees it and keeps the
+#     validated models plus one column per sort key, so later sorts of the
+#     same version only sort a column and encode the response
+#   - the worker returns the finished JSON body, the server only sends it
+# Meanwhile the server process stays free for point reads.
+#
+# SORT_OFFLOAD_WORKERS sets the pool size (default: number of cores, at most 4).
+
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+SORT_OFFLOAD_MIN_RECORDS = int(os.environ.get('SORT_OFFLOAD_MIN_RECORDS', '50000'))
+SORT_OFFLOAD_WORKERS = int(os.environ.get('SORT_OFFLOAD_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+SORT_KEYS = ('height_cm', 'weight_kg', 'bmi')
+
+
+class Snapshot:
+    # One version of the store in shared memory, unlinked once it is replaced
+    # and no sort is reading it any more.
+    def __init__(self, version, data):
+        self.version = version
+        self.size = len(data)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, self.size))
+        self.memory.buf[:self.size] = data
+        self.users = 0
+        self.replaced = False
+
+    def release(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+class SortOffload:
+
+    def __init__(self, store, model, min_records=SORT_OFFLOAD_MIN_RECORDS, workers=SORT_OFFLOAD_WORKERS):
+        self.store = store
+        self.model = model
+        self.min_records = min_records
+        self.workers = workers
+        self._pool = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def wanted(self):
+        return self.workers > 0 and len(self.store) >= self.min_records
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the server process already runs threads
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=get_context('spawn'),
+                                                 initializer=_init_worker, initargs=(self.model,))
+            return self._pool
+
+    def _acquire_snapshot(self):
+        with self.store.lock:
+            version = self.store.version
+            with self._lock:
+                current = self._snapshot
+                if current is None or current.version != version:
+                    if current is not None:
+                        current.replaced = True
+                        if current.users == 0:
+                            current.release()
+                    current = self._snapshot = Snapshot(version, self.store.json_bytes())
+                current.users += 1
+        return current
+
+    def _release_snapshot(self, snapshot):
+        with self._lock:
+            snapshot.users -= 1
+            if snapshot.replaced and snapshot.users == 0:
+                snapshot.release()
+
+    def sort(self, sort_by, reverse, include):
+        # (JSON body of the sorted records dumped with include (None = everything),
+        #  IDs of the records that aren't valid and were left out)
+        snapshot = self._acquire_snapshot()
+        try:
+            return self.pool.submit(_sort, snapshot.memory.name, snapshot.size, sort_by, reverse, include).result()
+        finally:
+            self._release_snapshot(snapshot)
+
+    def memory_usage(self):
+        # The shared memory copy of the store (the workers' decoded copies
+        # are in their own processes)
+        with self._lock:
+            snapshot = self._snapshot
+            return {'shared_memory_bytes': snapshot.size if snapshot is not None else 0,
+                    'workers_started': self._pool is not None}
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+            if self._snapshot is not None:
+                self._snapshot.release()
+                self._snapshot = None
+
+
+# ---- worker process ----
+
+_model = None
+_cached = None  # (snapshot name, models, {sort key: column}, skipped ids)
+
+
+def _init_worker(model):
+    global _model
+    _model = model
+
+
+def _load(name, size):
+    global _cached
+    if _cached is not None and _cached[0] == name:
+        return _cached
+    memory = shared_memory.SharedMemory(name)
+    try:
+        records = json.loads(bytes(memory.buf[:size]))
+    finally:
+        memory.close()
+    models = []
+    skipped = []
+    for student_id, record in records.items():
+        try:
+            models.append(_model(**{**record, 'id': student_id}))
+        except Exception:
+            skipped.append(student_id)  # invalid records are left out, as in the in-process sort
+    columns = {key: [getattr(model, key) for model in models] for key in SORT_KEYS}
+    _cached = (name, models, columns, skipped)
+    return _cached
+
+
+def _sort(name, size, sort_by, reverse, include):
+    _, models, columns, skipped = _load(name, size)
+    column = columns[sort_by]
+    order = sorted(range(len(models)), key=column.__getitem__, reverse=reverse)
+    return b'[' + b','.join([models[i].model_dump_json(include=include).encode() for i in order]) + b']', skipped
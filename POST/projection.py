@@ -0,0 +1,54 @@
+# Sparse fieldsets: ?fields=first_name,last_name,address.city
+#
+# parse_fields() turns the parameter into a pydantic include spec, e.g.
+#   {'first_name': True, 'last_name': True, 'address': {'city': True}}
+# checking every path against the model (computed fields like bmi count too).
+# The spec is used as model_dump(include=spec) for models (computed fields
+# that are not included are then never computed) and with project() for
+# records that are already plain dicts.
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+
+def _model_of(annotation):
+    return annotation if isinstance(annotation, type) and issubclass(annotation, BaseModel) else None
+
+
+def parse_fields(fields, model):
+    if not fields:
+        return None
+    spec = {}
+    for path in fields.split(','):
+        path = path.strip()
+        if not path:
+            continue
+        current_spec, current_model = spec, model
+        parts = path.split('.')
+        for i, name in enumerate(parts):
+            if current_model is None or (name not in current_model.model_fields and name not in current_model.model_computed_fields):
+                raise HTTPException(status_code=400, detail=f'Unknown field: {path}')
+            if i == len(parts) - 1:
+                current_spec[name] = True
+            else:
+                field = current_model.model_fields.get(name)
+                current_model = _model_of(field.annotation) if field else None
+                if current_spec.get(name) is True:
+                    break  # whole sub-object already requested
+                current_spec = current_spec.setdefault(name, {})
+    return spec
+
+
+def project(record, spec):
+    # Apply an include spec to a plain dict record (or a list of them)
+    if spec is None:
+        return record
+    if isinstance(record, list):
+        return [project(item, spec) for item in record]
+    if not isinstance(record, dict):
+        return record
+    result = {}
+    for name, sub_spec in spec.items():
+        if name in record:
+            result[name] = record[name] if sub_spec is True else project(record[name], sub_spec)
+    return result
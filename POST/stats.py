@@ -0,0 +1,82 @@
+# Materialized aggregates for the admissions dashboard.
+#
+# Counts by status, class_applied, gender, address.city and BMI verdict plus
+# the mean BMI, kept up to date by the store on every create/edit/delete
+# (an edit removes the old record from its buckets and adds the new one), so
+# /stats never has to scan the dataset.
+
+from collections import Counter
+
+from store import unwrap
+
+# (name in the response, path in the record)
+DIMENSIONS = [
+    ('by_status', ('status',)),
+    ('by_class_applied', ('class_applied',)),
+    ('by_gender', ('gender',)),
+    ('by_city', ('address', 'city')),
+    ('by_verdict', ('verdict',)),
+]
+
+
+def _value(record, path):
+    for key in path:
+        if not isinstance(record, dict):
+            return None
+        record = record.get(key)
+    return record
+
+
+class AdmissionStats:
+    name = 'stats'
+
+    def __init__(self):
+        self.rebuild([])
+
+    def rebuild(self, items):
+        self.total = 0
+        self.counters = {name: Counter() for name, _ in DIMENSIONS}
+        # BMI is stored rounded to 2 decimals, summing it in hundredths keeps
+        # the running total exact no matter how many edits it goes through
+        self.bmi_hundredths = 0
+        self.bmi_count = 0
+        for _, record in items:
+            self._apply(record, 1)
+
+    def update(self, student_id, old, new):
+        if old is not None:
+            self._apply(old, -1)
+        if new is not None:
+            self._apply(new, 1)
+
+    def _apply(self, record, sign):
+        self.total += sign
+        record = unwrap(record)
+        if record is None:
+            return
+        for name, path in DIMENSIONS:
+            value = _value(record, path)
+            if value is None:
+                continue
+            counter = self.counters[name]
+            counter[value] += sign
+            if counter[value] <= 0:
+                del counter[value]
+        bmi = record.get('bmi')
+        if isinstance(bmi, (int, float)):
+            self.bmi_hundredths += sign * round(bmi * 100)
+            self.bmi_count += sign
+
+    def state(self):
+        return (self.total, self.counters, self.bmi_hundredths, self.bmi_count)
+
+    def restore(self, state):
+        self.total, self.counters, self.bmi_hundredths, self.bmi_count = state
+
+    def summary(self):
+        mean = round(self.bmi_hundredths / 100 / self.bmi_count, 2) if self.bmi_count else None
+        result = {'total': self.total}
+        for name, counter in self.counters.items():
+            result[name] = dict(counter.most_common())
+        result['bmi'] = {'mean': mean, 'count': self.bmi_count}
+        return result
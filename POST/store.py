@@ -0,0 +1,393 @@
+# In-memory admission store with a binary snapshot for fast startup.
+#
+# school_admission.json stays the source of truth and is rewritten on every
+# write, exactly like save_data() did. On top of it the store keeps:
+#   - all records in memory, so requests no longer re-read and re-parse the file
+#   - a snapshot file (school_admission.snapshot) written on shutdown and after
+#     a full JSON load. It holds every record as its own JSON blob plus an
+#     offset index. Booting from it only reads the index; the file is mmap-ed
+#     and each record is decoded the first time it is asked for.
+#
+# Snapshot layout:
+#   b'ADMSNAP1' | 8 byte index length | pickled index | record blobs
+#   index = {'source': (size, mtime_ns) of the JSON file, 'ids': [...], 'offsets': array('Q')}
+# The snapshot is only used when the JSON file still matches 'source'; if the
+# JSON changed behind our back (crash mid-run, manual edit) we fall back to
+# parsing it and write a fresh snapshot.
+#
+# Hot/cold tiering (optional, pass hot=predicate): only records for which
+# hot(record) is true are kept decoded in memory. A cold record stays on disk
+# and is decoded on each read without being cached, either from the snapshot
+# or from the archive file (school_admission.archive), an append-only file of
+# record blobs. migrate(), run periodically by start_migration(), moves records
+# that went cold while in memory (e.g. a status change) to the archive;
+# write_snapshot() folds the archive into the snapshot and empties it. The
+# archive only mirrors memory, it is truncated on every start.
+#
+# A record is held as one of:
+#   dict (or legacy list)   decoded, in memory
+#   int                     slot of its blob in the snapshot
+#   (offset, length)        its blob in the archive
+#
+# Secondary indexes (aggregates, lookups...) are registered with add_index()
+# and kept up to date on every write. An index is any object with:
+#   name                       unique key for its state in the snapshot
+#   rebuild(items)             recompute from scratch from (id, record) pairs
+#   update(id, old, new)       apply one change, old/new are None on create/delete
+#   state() / restore(state)   picklable state, saved in the snapshot index so a
+#                              snapshot boot doesn't have to decode every record
+
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+from array import array
+
+from memory import deep_size, mapping_usage
+
+MAGIC = b'ADMSNAP1'
+HEADER = struct.Struct('<8sQ')
+
+
+_encoder = json.JSONEncoder(separators=(',', ':'))
+
+
+def encode(record):
+    return _encoder.encode(record).encode()
+
+
+def unwrap(record):
+    # Legacy rows are stored wrapped in a one-element list; returns the record
+    # dict, or None for anything that isn't one
+    if isinstance(record, list):
+        record = record[0] if record else None
+    return record if isinstance(record, dict) else None
+
+
+class StoreNotReady(Exception):
+    pass
+
+
+def on_disk(value):
+    return isinstance(value, (int, tuple))
+
+
+class AdmissionStore:
+
+    def __init__(self, json_path, snapshot_path, load_timeout=30.0, hot=None):
+        self.json_path = json_path
+        self.snapshot_path = snapshot_path
+        self.archive_path = os.path.splitext(snapshot_path)[0] + '.archive'
+        self.load_timeout = load_timeout
+        self.hot = hot  # None: every record is hot
+        # id -> decoded record, snapshot slot or archive (offset, length), see above
+        self._records = {}
+        self._mm = None
+        self._base = 0
+        self._offsets = None
+        self._archive_fd = None
+        self._archive_size = 0
+        self.migrated = 0
+        self.lock = threading.RLock()
+        self._loaded = threading.Event()
+        self._stop_migration = threading.Event()
+        self.loaded_from = None
+        self.version = 0  # bumped on every write, handy as a cache key
+        self.indexes = []
+
+    def add_index(self, index):
+        # Register before load()
+        self.indexes.append(index)
+        return index
+
+    # ---- loading / persistence ----
+
+    def load(self):
+        source = self._source_signature()
+        if not self._load_snapshot(source):
+            self._load_json()
+            self.loaded_from = 'json'
+            self._rebuild_indexes(self.indexes)
+            self.write_snapshot()
+        self._loaded.set()
+
+    def _rebuild_indexes(self, indexes):
+        for index in indexes:
+            index.rebuild((student_id, self._decode(student_id, value)) for student_id, value in self._records.items())
+
+    def load_in_background(self):
+        thread = threading.Thread(target=self.load, name='store-loader', daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self):
+        return self._loaded.is_set()
+
+    def wait_ready(self):
+        # Blocks until the data is loaded; StoreNotReady (503) after load_timeout.
+        # Routes that read indexes or aggregates rather than records call it first
+        if not self._loaded.wait(self.load_timeout):
+            raise StoreNotReady('Store is still loading')
+
+    def _source_signature(self):
+        try:
+            stat = os.stat(self.json_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _load_snapshot(self, source):
+        try:
+            f = open(self.snapshot_path, 'rb')
+        except FileNotFoundError:
+            return False
+        with f:
+            magic, index_length = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                return False
+            index = pickle.loads(f.read(index_length))
+            if index['source'] != source:
+                return False
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._base = HEADER.size + index_length
+        self._offsets = index['offsets']
+        self._records = dict(zip(index['ids'], range(len(index['ids']))))
+        self.loaded_from = 'snapshot'
+        saved = index.get('indexes', {})
+        for secondary in self.indexes:
+            if secondary.name in saved:
+                secondary.restore(saved[secondary.name])
+        # indexes added since the snapshot was written are built the slow way
+        self._rebuild_indexes([secondary for secondary in self.indexes if secondary.name not in saved])
+        return True
+
+    def _load_json(self):
+        try:
+            with open(self.json_path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}  # Return empty dict if file doesn't exist
+        except json.JSONDecodeError:
+            data = {}  # Return empty dict if JSON is invalid
+        self._records = data
+        self._mm = None
+        self._offsets = None
+
+    def _blob(self, student_id, value):
+        # Encoded JSON bytes of one record, copied straight from disk when not decoded
+        if isinstance(value, int):
+            return self._mm[self._base + self._offsets[value]:self._base + self._offsets[value + 1]]
+        if isinstance(value, tuple):
+            offset, length = value
+            return os.pread(self._archive_fd, length, offset)
+        return encode(value)
+
+    def _decode(self, student_id, value):
+        return json.loads(self._blob(student_id, value)) if on_disk(value) else value
+
+    def _is_hot(self, record):
+        return self.hot is None or self.hot(record)
+
+    def write_snapshot(self):
+        with self.lock:
+            source = self._source_signature()
+            ids = list(self._records)
+            offsets = array('Q', [0])
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                blobs = [self._blob(student_id, value) for student_id, value in self._records.items()]
+                for blob in blobs:
+                    offsets.append(offsets[-1] + len(blob))
+                states = {secondary.name: secondary.state() for secondary in self.indexes}
+                index = pickle.dumps({'source': source, 'ids': ids, 'offsets': offsets, 'indexes': states},
+                                     protocol=pickle.HIGHEST_PROTOCOL)
+                f.write(HEADER.pack(MAGIC, len(index)))
+                f.write(index)
+                f.writelines(blobs)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            # Point lazy records at the new file so the old mapping can be dropped
+            with open(self.snapshot_path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # record offsets are relative to the end of the index
+            self._base = HEADER.size + len(index)
+            self._offsets = offsets
+            # cold records in memory or in the archive now point at the snapshot
+            for slot, student_id in enumerate(ids):
+                value = self._records[student_id]
+                if on_disk(value) or not self._is_hot(value):
+                    self._records[student_id] = slot
+            if self._archive_fd is not None:
+                self._reset_archive()
+
+    def json_bytes(self):
+        # The whole dataset as a JSON object, spliced from the encoded records
+        # without decoding the ones that are still lazy.
+        self.wait_ready()
+        with self.lock:
+            body = b',\n'.join([b'%s:%s' % (encode(student_id), self._blob(student_id, value))
+                                for student_id, value in self._records.items()])
+        return b'{\n' + body + b'\n}'
+
+    def save(self):
+        # Write-through of the JSON file; written to a temp file and renamed so
+        # a reader (or a crash) never sees a half written file.
+        with self.lock:
+            tmp_path = self.json_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(self.json_bytes())
+            os.replace(tmp_path, self.json_path)
+
+    # ---- record access ----
+
+    def __contains__(self, student_id):
+        self.wait_ready()
+        return student_id in self._records
+
+    def __len__(self):
+        self.wait_ready()
+        return len(self._records)
+
+    def get(self, student_id, default=None):
+        self.wait_ready()
+        value = self._records.get(student_id)
+        if value is None:
+            return default
+        if on_disk(value):
+            with self.lock:  # the blob can move (snapshot rewrite, archive reset) while we read it
+                value = self._records.get(student_id)
+                if value is None:
+                    return default
+                blob = self._blob(student_id, value) if on_disk(value) else None
+            if blob is not None:
+                value = json.loads(blob)
+                if self._is_hot(value):
+                    with self.lock:
+                        if on_disk(self._records.get(student_id)):
+                            self._records[student_id] = value
+        return value
+
+    def get_many(self, student_ids):
+        # All lookups under one lock hold, so the result reflects a single
+        # version of the store even while writes are coming in.
+        # Returns ({id: record}, [missing ids]).
+        self.wait_ready()
+        found, missing = {}, []
+        with self.lock:
+            for student_id in student_ids:
+                record = self.get(student_id)
+                if record is None:
+                    missing.append(student_id)
+                else:
+                    found[student_id] = record
+        return found, missing
+
+    def items(self):
+        self.wait_ready()
+        with self.lock:
+            ids = list(self._records)
+        for student_id in ids:
+            record = self.get(student_id)
+            if record is not None:
+                yield student_id, record
+
+    def put(self, student_id, record):
+        self.wait_ready()
+        with self.lock:
+            old = self.get(student_id) if self.indexes else None
+            self._records[student_id] = record
+            for index in self.indexes:
+                index.update(student_id, old, record)
+            self.version += 1
+
+    def put_many(self, records):
+        self.wait_ready()
+        with self.lock:
+            for student_id, record in records.items():
+                self.put(student_id, record)
+
+    # ---- hot/cold tiering ----
+
+    def _reset_archive(self):
+        if self._archive_fd is None:
+            self._archive_fd = os.open(self.archive_path, os.O_RDWR | os.O_CREAT)
+        os.ftruncate(self._archive_fd, 0)
+        self._archive_size = 0
+
+    def migrate(self):
+        # Move records that are in memory but no longer hot to the archive.
+        # Returns how many were moved.
+        if self.hot is None or not self.ready:
+            return 0
+        with self.lock:
+            cold = [(student_id, encode(value)) for student_id, value in self._records.items()
+                    if not on_disk(value) and not self.hot(value)]
+            if not cold:
+                return 0
+            if self._archive_fd is None:
+                self._reset_archive()
+            os.pwrite(self._archive_fd, b''.join(blob for _, blob in cold), self._archive_size)
+            for student_id, blob in cold:
+                self._records[student_id] = (self._archive_size, len(blob))
+                self._archive_size += len(blob)
+            self.migrated += len(cold)
+        return len(cold)
+
+    def start_migration(self, interval):
+        # Runs migrate() every interval seconds until stop_migration()
+        self._stop_migration.clear()
+        def run():
+            while not self._stop_migration.wait(interval):
+                self.migrate()
+        thread = threading.Thread(target=run, name='store-migration', daemon=True)
+        thread.start()
+        return thread
+
+    def stop_migration(self, thread):
+        # Lets a running migrate() finish, so the snapshot written at shutdown
+        # doesn't race it
+        self._stop_migration.set()
+        thread.join()
+
+    def tier_stats(self):
+        self.wait_ready()
+        with self.lock:
+            values = list(self._records.values())
+        in_memory = [value for value in values if not on_disk(value)]
+        return {
+            'hot_in_memory': sum(1 for value in in_memory if self._is_hot(value)),
+            'cold_in_memory': sum(1 for value in in_memory if not self._is_hot(value)),  # until the next migration
+            'cold_in_snapshot': sum(1 for value in values if isinstance(value, int)),
+            'cold_in_archive': sum(1 for value in values if isinstance(value, tuple)),
+            'archive_bytes': self._archive_size,
+            'migrated': self.migrated,
+        }
+
+    def memory_usage(self):
+        # Records and estimated bytes of the record map (decoded records, and
+        # slots / archive positions of the ones on disk), plus the snapshot
+        # offsets and each index in full. The mmap-ed snapshot and the archive
+        # are file pages, not Python heap, and are reported separately.
+        self.wait_ready()
+        with self.lock:
+            usage = mapping_usage(self._records,
+                                  overhead=sys.getsizeof(self._offsets) if self._offsets is not None else 0)
+            usage['in_memory'] = sum(1 for value in self._records.values() if not on_disk(value))
+            usage['indexes'] = {index.name: deep_size(vars(index)) for index in self.indexes}
+            usage['snapshot_mmap_bytes'] = len(self._mm) if self._mm is not None else 0
+            usage['archive_bytes'] = self._archive_size
+        return usage
+
+    def delete(self, student_id):
+        self.wait_ready()
+        with self.lock:
+            old = self.get(student_id) if self.indexes else None
+            del self._records[student_id]
+            for index in self.indexes:
+                index.update(student_id, old, None)
+            self.version += 1
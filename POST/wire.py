@@ -0,0 +1,157 @@
+# MessagePack as an alternative wire format, chosen by content negotiation.
+#
+# A client sending "Accept: application/msgpack" (with a q above 0, and not
+# below the q it gives JSON) gets MessagePack instead of JSON from every JSON
+# endpoint (errors included):
+#   - routes returning data (dicts, lists, pydantic models) are packed
+#     straight from that data by NegotiatedResponse, the app's default
+#     response class, without going through JSON
+#   - responses that are already JSON bytes (cached /view bodies, the raw
+#     data file...) are converted by WireFormatMiddleware
+# Request bodies with "Content-Type: application/msgpack" are accepted by the
+# routes that read their body through ingest.json_body().
+#
+# msgpack is optional: without it the Accept header is ignored (JSON is
+# returned) and MessagePack request bodies are refused with 415.
+#
+# Usage:
+#   app = FastAPI()
+#   wire.install(app)   # before the routes are declared
+#   curl -H "Accept: application/msgpack" localhost:8000/view
+
+import contextvars
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+MSGPACK = 'application/msgpack'
+MSGPACK_TYPES = (b'application/msgpack', b'application/x-msgpack')
+
+# Set by the middleware when the client asked for MessagePack
+_msgpack_requested = contextvars.ContextVar('msgpack_requested', default=False)
+
+
+def packb(content):
+    return msgpack.packb(content, default=_default)
+
+
+def _default(value):
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json')
+    raise TypeError(f'Cannot pack {type(value).__name__}')
+
+
+class NegotiatedResponse(JSONResponse):
+    def render(self, content):
+        if _msgpack_requested.get():
+            self.media_type = MSGPACK
+            return packb(content)
+        return super().render(content)
+
+
+def _quality(media_range):
+    # (media type, q) of one Accept entry, e.g. b'application/msgpack;q=0.5'
+    media_type, *params = media_range.split(b';')
+    quality = 1.0
+    for param in params:
+        name, _, value = param.partition(b'=')
+        if name.strip().lower() == b'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+    return media_type.strip().lower(), quality
+
+
+def accepts_msgpack(scope):
+    # True when the client names MessagePack with a q above 0 and prefers it at
+    # least as much as JSON (exact type, then application/*, then */*)
+    if msgpack is None:
+        return False
+    accept = b','.join(value for key, value in scope['headers'] if key == b'accept')
+    if not accept:
+        return False
+    qualities = {}
+    for media_range in accept.split(b','):
+        if media_range.strip():
+            media_type, quality = _quality(media_range)
+            qualities[media_type] = max(quality, qualities.get(media_type, 0.0))
+    msgpack_quality = max((qualities.get(media_type, 0.0) for media_type in MSGPACK_TYPES), default=0.0)
+    if msgpack_quality <= 0:
+        return False
+    for media_type in (b'application/json', b'application/*', b'*/*'):
+        if media_type in qualities:
+            return msgpack_quality >= qualities[media_type]
+    return True
+
+
+def _vary_accept(headers):
+    # headers plus "Vary: Accept", merged into an existing Vary header
+    headers = list(headers)
+    for i, (key, value) in enumerate(headers):
+        if key.lower() == b'vary':
+            if b'accept' not in [item.strip().lower() for item in value.split(b',')] and value.strip() != b'*':
+                headers[i] = (key, value + b', Accept')
+            return headers
+    return headers + [(b'vary', b'Accept')]
+
+
+class WireFormatMiddleware:
+    # Every response says "Vary: Accept" so caches keep the JSON and the
+    # MessagePack version of a URL apart
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or msgpack is None:
+            return await self.app(scope, receive, send)
+
+        if not accepts_msgpack(scope):
+            async def send_json(message):
+                if message['type'] == 'http.response.start':
+                    message['headers'] = _vary_accept(message.get('headers', []))
+                await send(message)
+            return await self.app(scope, receive, send_json)
+
+        token = _msgpack_requested.set(True)
+        start = None
+        chunks = []
+
+        async def send_negotiated(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                headers = dict(message.get('headers', []))
+                if headers.get(b'content-type', b'').startswith(b'application/json'):
+                    start = message  # JSON body: hold it back and convert it
+                    return
+                message['headers'] = _vary_accept(message.get('headers', []))
+                return await send(message)
+            if start is None:
+                return await send(message)
+            chunks.append(message.get('body', b''))
+            if message.get('more_body', False):
+                return
+            body = packb(json.loads(b''.join(chunks))) if any(chunks) else b''
+            headers = [(key, value) for key, value in start.get('headers', [])
+                       if key not in (b'content-type', b'content-length')]
+            headers += [(b'content-type', MSGPACK.encode()), (b'content-length', str(len(body)).encode())]
+            await send({**start, 'headers': _vary_accept(headers)})
+            await send({'type': 'http.response.body', 'body': body})
+
+        try:
+            await self.app(scope, receive, send_negotiated)
+        finally:
+            _msgpack_requested.reset(token)
+
+
+def install(app):
+    # Must be called right after app = FastAPI(), before routes are declared,
+    # so every route is created with NegotiatedResponse.
+    app.router.default_response_class = NegotiatedResponse
+    app.add_middleware(WireFormatMiddleware)
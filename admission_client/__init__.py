@@ -0,0 +1,21 @@
+# Async Python client for the admission APIs, for batch jobs.
+#
+#   StudentsClient    - Docker/app.py: /students routes
+#   AdmissionsClient  - POST/main.py: /create, /edit, /delete, /student, /view, /sort
+#
+# Each client keeps one keep-alive connection pool with at most `concurrency`
+# requests in flight, merges single get()/create() calls made around the same
+# time into the bulk routes, and returns the apps' own Student / Admission
+# models. Use it as an async context manager so pending batches are sent and
+# the connections are closed:
+#
+#   async with AdmissionsClient('http://localhost:8000', concurrency=32) as client:
+#       await asyncio.gather(*(client.create(record) for record in records))
+#       student = await client.get('S001')
+
+from admission_client.admissions import AdmissionsClient
+from admission_client.models import Admission, Address, Student, StudentUpdate
+from admission_client.pool import APIError
+from admission_client.students import StudentsClient
+
+__all__ = ['APIError', 'Address', 'Admission', 'AdmissionsClient', 'Student', 'StudentUpdate', 'StudentsClient']
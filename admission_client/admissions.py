@@ -0,0 +1,172 @@
+# Client of the admission API (POST/main.py).
+#
+# get() and create() calls made around the same time are sent as one
+# POST /students/batch-get or POST /create/bulk. The bulk create is
+# all-or-nothing, so when it is refused (an ID or applicant already exists)
+# the batch is retried one admission at a time and only the offending calls
+# fail.
+#
+# Batching doesn't change what create() returns: /create/bulk checks each
+# record against the stored ones and the ones before it in the batch, so every
+# call gets the possible_duplicates it would get sent alone, in submit order.
+# A batch refused for a duplicate applicant is retried in that order too.
+
+import asyncio
+
+from pydantic import ValidationError
+
+from admission_client.batching import Batcher
+from admission_client.models import Admission, StudentUpdate
+from admission_client.pool import APIError, Pool
+
+MAX_BATCH_IDS = 1000  # server limit of /students/batch-get
+COMPUTED_FIELDS = {'bmi', 'verdict'}  # worked out again by the server
+
+
+def admission(student_id, record):
+    # Stored records don't carry their ID
+    return Admission.model_validate({**record, 'id': student_id})
+
+
+class AdmissionsClient:
+
+    def __init__(self, base_url='http://localhost:8000', concurrency=16, batch_size=500, batch_delay=0.005,
+                 timeout=30.0, retries=3):
+        self.pool = Pool(base_url, concurrency, timeout, retries)
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._gets = Batcher(self._get_batch, min(batch_size, MAX_BATCH_IDS), batch_delay)
+        self._creates = {}  # allow_duplicate -> Batcher
+        self.invalid_records = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self._gets.drain()
+        for batcher in self._creates.values():
+            await batcher.drain()
+        await self.pool.close()
+
+    # ---- reads ----
+
+    async def get(self, student_id):
+        # The Admission, or None if there is no such ID
+        return await self._gets.submit(student_id)
+
+    async def get_many(self, ids):
+        # {id: Admission} of the IDs that exist
+        ids = list(dict.fromkeys(ids))
+        chunks = await asyncio.gather(*(self._get_batch(ids[i:i + MAX_BATCH_IDS])
+                                        for i in range(0, len(ids), MAX_BATCH_IDS)))
+        found = [student for chunk in chunks for student in chunk]
+        # records that aren't valid admissions (legacy rows) are left out, as view() does
+        return {student_id: student for student_id, student in zip(ids, found)
+                if student is not None and not isinstance(student, Exception)}
+
+    async def _get_batch(self, ids):
+        # Each record is decoded on its own: an invalid one only fails the
+        # get() that asked for it (the Batcher raises returned exceptions)
+        body = await self.pool.request('POST', '/students/batch-get', json={'ids': ids})
+        found = body['students']
+        results = []
+        for student_id in ids:
+            if student_id not in found:
+                results.append(None)
+                continue
+            try:
+                results.append(admission(student_id, found[student_id]))
+            except (TypeError, ValidationError) as e:
+                self.invalid_records += 1
+                results.append(e)
+        return results
+
+    async def student(self, student_id):
+        # GET /student/{id} on its own, without batching
+        try:
+            return admission(student_id, await self.pool.request('GET', f'/student/{student_id}'))
+        except APIError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    async def view(self):
+        # {id: Admission} of every admission; records that aren't valid
+        # admissions (legacy rows) are left out, as /sort does
+        body = await self.pool.request('GET', '/view')
+        students = {}
+        for student_id, record in body.items():
+            try:
+                students[student_id] = admission(student_id, record)
+            except (TypeError, ValidationError):
+                self.invalid_records += 1
+        return students
+
+    async def sort(self, sort_by, order='asc'):
+        # Admissions sorted on height_cm, weight_kg or bmi
+        body = await self.pool.request('GET', '/sort', params={'sort_by': sort_by, 'order': order})
+        return [Admission.model_validate(record) for record in body]
+
+    # ---- writes ----
+
+    async def create(self, student, allow_duplicate=False):
+        # IDs of possible duplicates of this applicant (similar names), usually []
+        student = Admission.model_validate(student)
+        batcher = self._creates.get(allow_duplicate)
+        if batcher is None:
+            batcher = self._creates[allow_duplicate] = Batcher(
+                lambda students: self._create_batch(students, allow_duplicate), self.batch_size, self.batch_delay)
+        return await batcher.submit(student)
+
+    async def _create_batch(self, students, allow_duplicate):
+        params = {'allow_duplicate': str(allow_duplicate).lower()}
+        ids = [student.id for student in students]
+        unique = len(set(ids)) == len(ids)
+        if len(students) > 1 and unique:
+            try:
+                body = await self.pool.request('POST', '/create/bulk', params=params,
+                                               json=[self._body(student) for student in students])
+                possible = body.get('possible_duplicates', {})
+                return [possible.get(student.id, []) for student in students]
+            except APIError as e:
+                if e.status_code not in (400, 409):
+                    raise
+                sequential = e.status_code == 409
+        else:
+            sequential = not unique
+        if not sequential:
+            return await asyncio.gather(*(self._create_one(student, params) for student in students),
+                                        return_exceptions=True)
+        results = []
+        # same ID or applicant twice: one after the other, in submit order, so
+        # the later one fails or is flagged as it would be alone
+        for student in students:
+            try:
+                results.append(await self._create_one(student, params))
+            except APIError as e:
+                results.append(e)
+        return results
+
+    async def _create_one(self, student, params):
+        body = await self.pool.request('POST', '/create', params=params, json=self._body(student))
+        return body.get('possible_duplicates', [])
+
+    @staticmethod
+    def _body(student):
+        return student.model_dump(mode='json', exclude=COMPUTED_FIELDS)
+
+    async def edit(self, student_id, update):
+        # update is a StudentUpdate or a dict of the fields to change
+        update = StudentUpdate.model_validate(update)
+        await self.pool.request('PUT', f'/edit/{student_id}', json=update.model_dump(mode='json', exclude_unset=True))
+
+    async def delete(self, student_id):
+        await self.pool.request('DELETE', f'/delete/{student_id}')
+
+    def stats(self):
+        return {'requests': self.pool.requests, 'retried': self.pool.retried, 'invalid_records': self.invalid_records,
+                'gets': self._gets.stats(),
+                'creates': {str(allow).lower(): batcher.stats() for allow, batcher in self._creates.items()}}
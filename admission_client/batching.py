@@ -0,0 +1,64 @@
+# Collects single-record calls made around the same time into one bulk call.
+#
+# submit(item) waits at most `delay` seconds (or until `max_size` items are
+# pending) and then send(items) is called once for the whole batch. send
+# returns one result per item, in order; a result that is an exception is
+# raised to that item's caller only.
+
+import asyncio
+
+
+class Batcher:
+
+    def __init__(self, send, max_size=500, delay=0.005):
+        self.send = send
+        self.max_size = max_size
+        self.delay = delay
+        self._pending = []
+        self._timer = None
+        self._sending = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def drain(self):
+        # Send what is pending now and wait for every batch in flight
+        self._flush()
+        if self._sending:
+            await asyncio.gather(*self._sending)
+
+    async def _send(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.send([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # caller was cancelled
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {'batches': self.batches, 'items': self.items}
@@ -0,0 +1,24 @@
+# The apps' own models, loaded from Docker/models.py and POST/models.py by
+# path (the app folders aren't packages), so responses are validated exactly
+# as the servers validate requests.
+
+import importlib.util
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load(app_dir, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_ROOT, app_dir, 'models.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_docker = _load('Docker', 'admission_client._docker_models')
+_post = _load('POST', 'admission_client._post_models')
+
+Student = _docker.Student
+Admission = _post.Admission
+Address = _post.Address
+StudentUpdate = _post.StudentUpdate
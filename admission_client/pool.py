@@ -0,0 +1,50 @@
+# One keep-alive connection pool per client, with at most `concurrency`
+# requests in flight. 503 responses (load shedding, store still loading) are
+# retried after their Retry-After delay.
+
+import asyncio
+
+import httpx
+
+
+class APIError(Exception):
+
+    def __init__(self, status_code, detail):
+        super().__init__(f'{status_code}: {detail}')
+        self.status_code = status_code
+        self.detail = detail
+
+
+class Pool:
+
+    def __init__(self, base_url, concurrency=16, timeout=30.0, retries=3):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self.slots = asyncio.Semaphore(concurrency)
+        self.retries = retries
+        self.requests = 0
+        self.retried = 0
+
+    async def request(self, method, path, **kwargs):
+        # Decoded JSON body of a 2xx response, APIError otherwise
+        for attempt in range(self.retries + 1):
+            async with self.slots:
+                response = await self.client.request(method, path, **kwargs)
+                self.requests += 1
+            if response.status_code != 503 or attempt == self.retries:
+                break
+            self.retried += 1
+            await asyncio.sleep(float(response.headers.get('retry-after', '1')))
+        if response.is_success:
+            return response.json()
+        try:
+            detail = response.json().get('detail')
+        except ValueError:
+            detail = response.text
+        raise APIError(response.status_code, detail)
+
+    async def close(self):
+        await self.client.aclose()
@@ -0,0 +1,122 @@
+# Client of the Docker app's /students routes (Docker/app.py).
+#
+# get() and create() calls made around the same time are sent as one
+# POST /students/batch-get or POST /students/bulk. The bulk create is
+# all-or-nothing, so when it is refused (an ID already exists) the batch is
+# retried one student at a time and only the offending calls fail.
+
+import asyncio
+
+from admission_client.batching import Batcher
+from admission_client.models import Student
+from admission_client.pool import APIError, Pool
+
+MAX_BATCH_IDS = 1000  # server limit of /students/batch-get
+
+
+class StudentsClient:
+
+    def __init__(self, base_url='http://localhost:8000', concurrency=16, batch_size=500, batch_delay=0.005,
+                 timeout=30.0, retries=3):
+        self.pool = Pool(base_url, concurrency, timeout, retries)
+        self._gets = Batcher(self._get_batch, min(batch_size, MAX_BATCH_IDS), batch_delay)
+        self._creates = Batcher(self._create_batch, batch_size, batch_delay)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self._gets.drain()
+        await self._creates.drain()
+        await self.pool.close()
+
+    # ---- reads ----
+
+    async def get(self, student_id):
+        # The Student, or None if there is no such ID
+        return await self._gets.submit(student_id)
+
+    async def get_many(self, ids):
+        # {id: Student} of the IDs that exist
+        ids = list(dict.fromkeys(ids))
+        chunks = await asyncio.gather(*(self._get_batch(ids[i:i + MAX_BATCH_IDS])
+                                        for i in range(0, len(ids), MAX_BATCH_IDS)))
+        found = [student for chunk in chunks for student in chunk]
+        return {student_id: student for student_id, student in zip(ids, found) if student is not None}
+
+    async def _get_batch(self, ids):
+        body = await self.pool.request('POST', '/students/batch-get', json={'ids': ids})
+        found = {item.pop('id'): Student.model_validate(item) for item in body['items']}
+        return [found.get(student_id) for student_id in ids]
+
+    async def page(self, cursor=None, limit=100):
+        # ([(id, Student), ...], next_cursor), ordered by ID; next_cursor is None on the last page
+        params = {'limit': limit}
+        if cursor is not None:
+            params['cursor'] = cursor
+        body = await self.pool.request('GET', '/students', params=params)
+        items = [(item.pop('id'), Student.model_validate(item)) for item in body['items']]
+        return items, body['next_cursor']
+
+    async def iterate(self, page_size=1000):
+        # Every (id, Student), one page at a time
+        cursor = None
+        while True:
+            items, cursor = await self.page(cursor, page_size)
+            for item in items:
+                yield item
+            if cursor is None:
+                return
+
+    async def find_by_name(self, name):
+        try:
+            body = await self.pool.request('GET', f'/students/by-name/{name}')
+        except APIError as e:
+            if e.status_code == 404:
+                return []
+            raise
+        return [Student.model_validate(student) for student in body]
+
+    # ---- writes ----
+
+    async def create(self, student_id, student):
+        return await self._creates.submit((student_id, Student.model_validate(student)))
+
+    async def _create_batch(self, items):
+        ids = [student_id for student_id, _ in items]
+        unique = len(set(ids)) == len(ids)
+        if len(items) > 1 and unique:
+            try:
+                await self.pool.request('POST', '/students/bulk',
+                                        json={str(student_id): student.model_dump() for student_id, student in items})
+                return [student for _, student in items]
+            except APIError as e:
+                if e.status_code != 400:
+                    raise
+        if unique:
+            return await asyncio.gather(*(self._create_one(*item) for item in items), return_exceptions=True)
+        results = []
+        for item in items:  # same ID twice: one after the other, the second one fails as it would alone
+            try:
+                results.append(await self._create_one(*item))
+            except APIError as e:
+                results.append(e)
+        return results
+
+    async def _create_one(self, student_id, student):
+        body = await self.pool.request('POST', f'/students/{student_id}', json=student.model_dump())
+        return Student.model_validate(body['student'])
+
+    async def update(self, student_id, student):
+        body = await self.pool.request('PUT', f'/students/{student_id}', json=Student.model_validate(student).model_dump())
+        return Student.model_validate(body['student'])
+
+    async def delete(self, student_id):
+        await self.pool.request('DELETE', f'/students/{student_id}')
+
+    def stats(self):
+        return {'requests': self.pool.requests, 'retried': self.pool.retried,
+                'gets': self._gets.stats(), 'creates': self._creates.stats()}
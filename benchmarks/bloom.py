@@ -0,0 +1,88 @@
+# Bloom filter in front of the sharded Docker student store.
+#
+#   accuracy     - false positive rate measured on IDs that were never added,
+#                  next to the configured target and the theoretical estimate
+#   enumeration  - scraper-like traffic: existence checks of random IDs, most
+#                  of them unknown, against ShardedStudentStore with the filter
+#                  and with a plain shard round trip per check
+#
+# Usage:
+#   python -m benchmarks.bloom --records 100000 --probes 20000 --shards 2
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'Docker'))
+
+from bloom import BloomFilter  # noqa: E402
+from shards import ShardedStudentStore  # noqa: E402
+
+from benchmarks.shards import Student, students  # noqa: E402
+
+
+def accuracy(records, probes, fp_rate):
+    bloom = BloomFilter(records, fp_rate)
+    for student_id in range(1, records + 1):
+        bloom.add(student_id)
+    unknown = range(records + 1, records + 1 + probes)
+    false_positives = sum(1 for student_id in unknown if student_id in bloom)
+    return {
+        'target_fp_rate': fp_rate,
+        'expected_fp_rate': round(bloom.expected_fp_rate(), 6),
+        'observed_fp_rate': round(false_positives / probes, 6),
+        'bits_per_id': round(bloom.size / records, 2),
+        'hashes': bloom.hashes,
+    }
+
+
+def enumeration(records, probes, shards, seed):
+    store = ShardedStudentStore(Student, shards)
+    store.update(students(records))
+    rng = random.Random(seed)
+    ids = [rng.randint(1, records * 10) for _ in range(probes)]  # ~90% unknown
+
+    start = time.perf_counter()
+    with_filter = sum(1 for student_id in ids if student_id in store)
+    filtered = time.perf_counter() - start
+
+    start = time.perf_counter()
+    without_filter = sum(1 for student_id in ids if store.shard_of(student_id).call('get', student_id) is not None)
+    unfiltered = time.perf_counter() - start
+
+    assert with_filter == without_filter
+    return {
+        'known_ids': with_filter,
+        'unknown_ids': probes - with_filter,
+        'with_filter_checks/s': round(probes / filtered),
+        'shard_round_trip_checks/s': round(probes / unfiltered),
+        'filter': store.id_filter.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bloom filter accuracy and random-ID enumeration throughput')
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--probes', type=int, default=20000)
+    parser.add_argument('--shards', type=int, default=2)
+    parser.add_argument('--fp-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help='optional path to save results as JSON')
+    args = parser.parse_args()
+
+    results = {
+        'accuracy': accuracy(args.records, args.probes, args.fp_rate),
+        'enumeration': enumeration(args.records, args.probes, args.shards, args.seed),
+    }
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'records': args.records, 'probes': args.probes, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Synthetic datasets for the benchmarks.
+# The shipped student.json / school_admission.json only hold a handful of rows,
+# which hides every scaling problem. These helpers build files of any size
+# (1k .. 1M records) in the same shape each app expects, using a fixed seed so
+# two runs on different commits see exactly the same data.
+#
+# Usage:
+#   python -m benchmarks.datasets --app get --size 100000 --out /tmp/student.json
+#   python -m benchmarks.datasets --app post --size 100000 --out /tmp/school_admission.json
+
+import argparse
+import json
+import random
+
+FIRST_NAMES = ['Ali', 'Sara', 'Hassan', 'Ayesha', 'Bilal', 'Fatima', 'Usman', 'Zainab', 'Hamza', 'Maryam',
+               'Omar', 'Hira', 'Saad', 'Iqra', 'Danish', 'Noor', 'Fahad', 'Amna', 'Talha', 'Sana']
+LAST_NAMES = ['Khan', 'Ahmed', 'Raza', 'Malik', 'Hussain', 'Sheikh', 'Butt', 'Chaudhry', 'Qureshi', 'Siddiqui']
+CITIES = [('Lahore', 'Punjab'), ('Karachi', 'Sindh'), ('Islamabad', 'Islamabad Capital Territory'),
+          ('Faisalabad', 'Punjab'), ('Multan', 'Punjab'), ('Peshawar', 'Khyber Pakhtunkhwa'),
+          ('Quetta', 'Balochistan'), ('Hyderabad', 'Sindh')]
+FIELDS = ['Web Development', 'Artificial Intelligence', 'App Development', 'Data Science', 'Cyber Security']
+STATUSES = ['Pending', 'Approved', 'Rejected']
+
+
+def student_record(rng, student_id):
+    # Shape of GET/student.json
+    return {
+        'id': student_id,
+        'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+        'weight': rng.randint(45, 95),
+        'cgpa': round(rng.uniform(2.0, 4.0), 2),
+        'age': rng.randint(18, 30),
+        'gender': rng.choice(['Male', 'Female']),
+        'city': rng.choice(CITIES)[0],
+        'field_interested': rng.choice(FIELDS),
+    }
+
+
+def admission_record(rng, student_id):
+    # Shape stored by POST/main.py create_student (flat object, id is the key)
+    height = rng.randint(100, 170)
+    weight = rng.randint(18, 70)
+    city, state = rng.choice(CITIES)
+    last_name = rng.choice(LAST_NAMES)
+    record = {
+        'first_name': rng.choice(FIRST_NAMES),
+        'last_name': last_name,
+        'gender': rng.choice(['male', 'female']),
+        'date_of_birth': f'{rng.randint(2008, 2019)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        'class_applied': f'Grade {rng.randint(1, 10)}',
+        'height_cm': float(height),
+        'weight_kg': float(weight),
+        'father_name': f'{rng.choice(FIRST_NAMES)} {last_name}',
+        'contact_number': f'+92-3{rng.randint(0, 49):02d}-{rng.randint(0, 9999999):07d}',
+        'address': {'city': city, 'state': state},
+        'status': rng.choice(STATUSES),
+    }
+    bmi = round(weight / ((height / 100) ** 2), 2)
+    record['bmi'] = bmi
+    record['verdict'] = 'Underweight' if bmi < 18.5 else 'Normal' if bmi < 25 else 'Overweight' if bmi < 30 else 'Obese'
+    return record
+
+
+def docker_record(rng, student_id):
+    # Shape of the Student model in Docker/app.py
+    return {
+        'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+        'father_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+        'age': rng.randint(4, 18),
+        'class_name': f'Grade {rng.randint(1, 12)}',
+    }
+
+
+BUILDERS = {'get': student_record, 'post': admission_record, 'docker': docker_record}
+
+
+def generate(app, size, seed=42):
+    # Returns {str_id: record} for the given app, ids are "1".."size"
+    rng = random.Random(seed)
+    build = BUILDERS[app]
+    return {str(i): build(rng, i) for i in range(1, size + 1)}
+
+
+def write_dataset(app, size, path, seed=42):
+    data = generate(app, size, seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    return data
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic dataset for one of the apps')
+    parser.add_argument('--app', choices=sorted(BUILDERS), required=True)
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+    write_dataset(args.app, args.size, args.out, args.seed)
+    print(f'wrote {args.size} {args.app} records to {args.out}')
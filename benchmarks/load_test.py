@@ -0,0 +1,323 @@
+# Load-testing benchmark for the three apps (GET/main.py, POST/main.py, Docker/app.py).
+#
+# For every app and transport mode it:
+#   1. generates a synthetic dataset of --size records (see benchmarks/datasets.py)
+#   2. starts the app in a fresh interpreter, either in-process (ASGI transport,
+#      no network) or behind a real uvicorn socket on 127.0.0.1
+#   3. replays a seeded mix of reads and writes with --concurrency clients
+#   4. reports throughput and latency percentiles per endpoint
+#
+# Results are written as JSON so two commits can be compared:
+#   python -m benchmarks.load_test --size 10000 --requests 2000 --out before.json
+#   python -m benchmarks.load_test --size 10000 --requests 2000 --out after.json
+#   python -m benchmarks.load_test --compare before.json after.json
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from benchmarks.datasets import generate
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app name -> (directory, entry module, data file the app reads from its working directory)
+APPS = {
+    'get': ('GET', 'main.py', 'student.json'),
+    'post': ('POST', 'main.py', 'school_admission.json'),
+    'docker': ('Docker', 'app.py', None),
+}
+MODES = ['asgi', 'socket']
+
+
+# Workloads: list of (weight, label, builder). A builder takes (rng, state) and
+# returns (method, url, json_body). Labels are the route templates so results
+# group per endpoint instead of per concrete URL.
+
+def get_workload(size):
+    return [
+        (70, 'GET /students/{id}', lambda rng, st: ('GET', f'/students/{rng.randint(1, size)}', None)),
+        (10, 'GET /view', lambda rng, st: ('GET', '/view', None)),
+        (20, 'GET /sort_students', lambda rng, st: ('GET', f"/sort_students?sort_by={rng.choice(['cgpa', 'age', 'weight'])}&order={rng.choice(['asc', 'desc'])}", None)),
+    ]
+
+
+def post_workload(size):
+    # Reads and edits stay in the lower half of the id space, deletes walk the
+    # upper half once and creates use fresh ids, so the mix is deterministic
+    # regardless of the order concurrent requests complete in.
+    def create(rng, st):
+        st['next_id'] += 1
+        body = generate('post', 1, seed=st['next_id'])['1']
+        body['id'] = str(st['next_id'])
+        body.pop('bmi'), body.pop('verdict')
+        return 'POST', '/create', body
+
+    def delete(rng, st):
+        st['next_delete'] += 1
+        return 'DELETE', f"/delete/{st['next_delete']}", None
+
+    half = max(size // 2, 1)
+    return [
+        (55, 'GET /student/{id}', lambda rng, st: ('GET', f'/student/{rng.randint(1, half)}', None)),
+        (5, 'GET /view', lambda rng, st: ('GET', '/view', None)),
+        (15, 'GET /sort', lambda rng, st: ('GET', f"/sort?sort_by={rng.choice(['height_cm', 'weight_kg', 'bmi'])}&order={rng.choice(['asc', 'desc'])}", None)),
+        (10, 'POST /create', create),
+        (10, 'PUT /edit/{id}', lambda rng, st: ('PUT', f'/edit/{rng.randint(1, half)}', {'weight_kg': float(rng.randint(18, 70))})),
+        (5, 'DELETE /delete/{id}', delete),
+    ]
+
+
+def docker_workload(size):
+    def create(rng, st):
+        st['next_id'] += 1
+        return 'POST', f"/students/{st['next_id']}", generate('docker', 1, seed=st['next_id'])['1']
+
+    def delete(rng, st):
+        st['next_delete'] += 1
+        return 'DELETE', f"/students/{st['next_delete']}", None
+
+    half = max(size // 2, 1)
+    return [
+        (60, 'GET /students/{id}', lambda rng, st: ('GET', f'/students/{rng.randint(1, half)}', None)),
+        (10, 'GET /students/by-name/{name}', lambda rng, st: ('GET', f"/students/by-name/{generate('docker', 1, seed=rng.randint(1, size))['1']['name']}", None)),
+        (10, 'POST /students/{id}', create),
+        (15, 'PUT /students/{id}', lambda rng, st: ('PUT', f'/students/{rng.randint(1, half)}', generate('docker', 1, seed=rng.randint(1, size))['1'])),
+        (5, 'DELETE /students/{id}', delete),
+    ]
+
+
+WORKLOADS = {'get': get_workload, 'post': post_workload, 'docker': docker_workload}
+
+
+def build_operations(app, size, count, seed):
+    rng = random.Random(seed)
+    workload = WORKLOADS[app](size)
+    weights = [w for w, _, _ in workload]
+    state = {'next_id': size, 'next_delete': max(size // 2, 1)}
+    ops = []
+    for _ in range(count):
+        _, label, builder = rng.choices(workload, weights=weights)[0]
+        ops.append((label, *builder(rng, state)))
+    return ops
+
+
+def load_app(app, workdir, dataset):
+    # Import the app module from its directory with the working directory set
+    # to a scratch folder holding the synthetic data file.
+    app_dir, entry, data_file = APPS[app]
+    app_path = os.path.join(REPO_ROOT, app_dir)
+    if data_file:
+        with open(os.path.join(workdir, data_file), 'w', encoding='utf-8') as f:
+            json.dump(dataset, f, indent=2)
+    os.chdir(workdir)
+    sys.path.insert(0, app_path)
+    spec = importlib.util.spec_from_file_location(f'bench_{app}_app', os.path.join(app_path, entry))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if app == 'docker':
+        # Docker/app.py has no data file to read, seed its store directly
+        module.students.update({int(k): module.Student(**v) for k, v in dataset.items()})
+    return module
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies, statuses, elapsed):
+    endpoints = {}
+    for label, values in sorted(latencies.items()):
+        values.sort()
+        endpoints[label] = {
+            'count': len(values),
+            'throughput_rps': round(len(values) / elapsed, 2),
+            'mean_ms': round(sum(values) / len(values) * 1000, 3),
+            'p50_ms': round(percentile(values, 50) * 1000, 3),
+            'p90_ms': round(percentile(values, 90) * 1000, 3),
+            'p99_ms': round(percentile(values, 99) * 1000, 3),
+            'max_ms': round(values[-1] * 1000, 3),
+            'status_codes': dict(sorted(statuses[label].items())),
+        }
+    total = sum(e['count'] for e in endpoints.values())
+    return {'elapsed_s': round(elapsed, 3), 'total_requests': total,
+            'throughput_rps': round(total / elapsed, 2), 'endpoints': endpoints}
+
+
+async def replay(client, ops, concurrency):
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    position = iter(ops)
+
+    async def worker():
+        for label, method, url, body in position:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            await response.aread()
+            latencies[label].append(time.perf_counter() - start)
+            statuses[label][str(response.status_code)] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+async def run_asgi(module, ops, warmup, concurrency):
+    app = module.app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+            await replay(client, warmup, concurrency)
+            return await replay(client, ops, concurrency)
+
+
+async def run_socket(module, ops, warmup, concurrency):
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    # The server runs on its own thread and event loop. Client and server share
+    # one interpreter, so absolute numbers are pessimistic, but it exercises the
+    # real HTTP parsing / socket path that the ASGI mode skips.
+    server = uvicorn.Server(uvicorn.Config(module.app, log_level='warning', access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=None) as client:
+            await replay(client, warmup, concurrency)
+            return await replay(client, ops, concurrency)
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def run_single(args):
+    # Runs one (app, mode) pair; called in a fresh interpreter by run_all so the
+    # apps' module-level state and sibling imports never leak between runs.
+    dataset = generate(args.app, args.size, args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        module = load_app(args.app, workdir, dataset)
+        del dataset
+        ops = build_operations(args.app, args.size, args.requests, args.seed)
+        warmup = [op for op in build_operations(args.app, args.size, args.warmup, args.seed + 1) if op[1] == 'GET']
+        runner = run_asgi if args.mode == 'asgi' else run_socket
+        latencies, statuses, elapsed = asyncio.run(runner(module, ops, warmup, args.concurrency))
+        os.chdir(REPO_ROOT)
+    return summarize(latencies, statuses, elapsed)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(args):
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'size': args.size,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+        },
+        'results': {},
+    }
+    for app in args.apps:
+        for mode in args.modes:
+            print(f'running {app} / {mode} ...', file=sys.stderr)
+            cmd = [sys.executable, '-m', 'benchmarks.load_test', '--single', '--app', app, '--mode', mode,
+                   '--size', str(args.size), '--requests', str(args.requests), '--warmup', str(args.warmup),
+                   '--concurrency', str(args.concurrency), '--seed', str(args.seed)]
+            output = subprocess.check_output(cmd, cwd=REPO_ROOT, text=True)
+            results['results'].setdefault(app, {})[mode] = json.loads(output)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+    print(f'\nsaved to {args.out}', file=sys.stderr)
+
+
+def print_results(results):
+    for app, modes in results['results'].items():
+        for mode, summary in modes.items():
+            print(f"\n== {app} / {mode}: {summary['throughput_rps']} req/s over {summary['elapsed_s']}s")
+            print(f"{'endpoint':<34}{'count':>7}{'rps':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+            for label, e in summary['endpoints'].items():
+                print(f"{label:<34}{e['count']:>7}{e['throughput_rps']:>10}{e['p50_ms']:>10}{e['p90_ms']:>10}{e['p99_ms']:>10}{e['max_ms']:>10}")
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"comparing {old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    for app, modes in new['results'].items():
+        for mode, summary in modes.items():
+            before = old['results'].get(app, {}).get(mode)
+            if not before:
+                continue
+            print(f'\n== {app} / {mode}')
+            print(f"{'endpoint':<34}{'rps':>18}{'p50 ms':>22}{'p99 ms':>22}")
+            for label, e in summary['endpoints'].items():
+                b = before['endpoints'].get(label)
+                if not b:
+                    continue
+                cells = []
+                for key in ('throughput_rps', 'p50_ms', 'p99_ms'):
+                    change = (e[key] - b[key]) / b[key] * 100 if b[key] else 0.0
+                    cells.append(f'{b[key]}->{e[key]} ({change:+.0f}%)')
+                print(f'{label:<34}{cells[0]:>18}{cells[1]:>22}{cells[2]:>22}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test the GET, POST and Docker apps')
+    parser.add_argument('--apps', nargs='+', choices=sorted(APPS), default=sorted(APPS))
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--size', type=int, default=1000, help='records in the synthetic dataset (1k..1M)')
+    parser.add_argument('--requests', type=int, default=2000, help='measured requests per app and mode')
+    parser.add_argument('--warmup', type=int, default=100, help='read requests sent before measuring')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default=os.path.join('benchmarks', 'results', 'load_test.json'))
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two saved result files')
+    # internal: run one app/mode and print its summary as JSON
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--app', choices=sorted(APPS), help=argparse.SUPPRESS)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    elif args.single:
+        print(json.dumps(run_single(args)))
+    else:
+        run_all(args)
@@ -0,0 +1,188 @@
+# Micro-benchmarks for the pydantic patterns taught in pydantic/ and used by the apps.
+#
+# Each model shape mirrors one tutorial file (the tutorials print at import time
+# and start with a digit, so they are re-declared here). For every shape we time:
+#   - model_validate(dict)            (what our code does with Model(**data))
+#   - json.loads + model_validate     (what FastAPI does with a request body)
+#   - model_validate_json(bytes)      (single pass in pydantic-core)
+#   - model_dump() / model_dump_json()
+# in lax mode and with strict=True, so the cost of validators, computed fields,
+# nesting and type coercion can be read straight from the table.
+#
+# Usage:
+#   python -m benchmarks.pydantic_models
+#   python -m benchmarks.pydantic_models --shapes computed_field nested --out results.json
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import timeit
+from typing import Dict, List
+
+import pydantic
+from pydantic import BaseModel, ConfigDict, EmailStr, computed_field, field_validator, model_validator
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# 1-pydantic.py: plain fields, no validators
+class Patient(BaseModel):
+    name: str
+    email: EmailStr
+    age: int
+    weight: float
+    married: bool
+    allergies: List[str]
+    contact_details: Dict[str, str]
+
+
+# 2-field.py: field validators (validation + transformation)
+class PatientFieldValidators(Patient):
+
+    @field_validator('email')
+    @classmethod
+    def email_validator(cls, value):
+        valid_domains = ['uet.com', 'faysalbank.com']
+        if value.split('@')[-1] not in valid_domains:
+            raise ValueError('Not a valid domain')
+        return value
+
+    @field_validator('name')
+    @classmethod
+    def transform_name(cls, value):
+        return value.upper()
+
+    @field_validator('age', mode='after')
+    @classmethod
+    def validate_age(cls, value):
+        if 0 < value < 100:
+            return value
+        raise ValueError('Age should be in between 0 and 100')
+
+
+# 3-modelvalidator.py: whole-object validation
+class PatientModelValidator(Patient):
+
+    @model_validator(mode='after')
+    def validate_emergency_contact(self):
+        if self.age > 60 and 'emergency' not in self.contact_details:
+            raise ValueError('Patients older than 60 must have an emergency contact')
+        return self
+
+
+# 4-compute-field.py: computed field
+class PatientComputed(Patient):
+    height: float
+
+    @computed_field
+    @property
+    def bmi(self) -> float:
+        return round(self.weight / (self.height ** 2), 2)
+
+
+# 5-nested-model.py / 6-serializatio.py: nested model
+class Address(BaseModel):
+    city: str
+    state: str
+    pin: str
+
+
+class PatientNested(BaseModel):
+    name: str
+    gender: str = 'Male'
+    age: int
+    address: Address
+
+
+# POST/models.py Admission: nested + constrained fields + a date validator + two
+# computed fields. Loaded by path (the app folders aren't packages) so every
+# benchmark times the app's own model rather than a copy that drifts from it
+def load_post_models():
+    spec = importlib.util.spec_from_file_location('benchmarks._post_models', os.path.join(REPO_ROOT, 'POST', 'models.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+Admission = load_post_models().Admission
+
+
+def strict(model):
+    # Same model with strict=True: no coercion of '30' -> 30 etc.
+    return type(f'{model.__name__}Strict', (model,), {'model_config': ConfigDict(strict=True)})
+
+
+PATIENT = {'name': 'adil', 'email': 'abc@uet.com', 'age': 30, 'weight': 75.2, 'married': True,
+           'allergies': ['pollen', 'dust'], 'contact_details': {'phone': '2353462', 'emergency': '235236'}}
+ADMISSION = {'id': 'S001', 'first_name': 'Ali', 'last_name': 'Khan', 'gender': 'male', 'date_of_birth': '2015-04-12',
+             'class_applied': 'Grade 4', 'height_cm': 135.0, 'weight_kg': 32.0, 'father_name': 'Ahmed Khan',
+             'contact_number': '+92-300-1234567', 'address': {'city': 'Lahore', 'state': 'Punjab'}, 'status': 'Pending'}
+
+# shape -> (model, input already in the right types, input that needs lax coercion)
+SHAPES = {
+    'plain': (Patient, PATIENT, {**PATIENT, 'age': '30', 'weight': '75.2'}),
+    'field_validators': (PatientFieldValidators, PATIENT, {**PATIENT, 'age': '30', 'weight': '75.2'}),
+    'model_validator': (PatientModelValidator, PATIENT, {**PATIENT, 'age': '30', 'weight': '75.2'}),
+    'computed_field': (PatientComputed, {**PATIENT, 'height': 1.72}, {**PATIENT, 'age': '30', 'height': '1.72'}),
+    'nested': (PatientNested, {'name': 'adil', 'gender': 'male', 'age': 35, 'address': {'city': 'gurgaon', 'state': 'haryana', 'pin': '122001'}},
+               {'name': 'adil', 'gender': 'male', 'age': '35', 'address': {'city': 'gurgaon', 'state': 'haryana', 'pin': '122001'}}),
+    'admission': (Admission, ADMISSION, {**ADMISSION, 'height_cm': '135', 'weight_kg': 32}),
+}
+
+
+def time_op(func, min_time):
+    # Best of 5 runs, each lasting roughly min_time so timer overhead is noise.
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time / 10:
+            break
+        number *= 10
+    number = max(1, int(number * min_time / elapsed))
+    best = min(timer.repeat(repeat=5, number=number)) / number
+    return {'us_per_op': round(best * 1e6, 3), 'ops_per_s': round(1 / best)}
+
+
+def bench_shape(name, min_time):
+    model, typed, coercible = SHAPES[name]
+    results = {}
+    for mode, cls, data in (('lax', model, coercible), ('strict', strict(model), typed)):
+        raw = json.dumps(data).encode()
+        instance = cls.model_validate(data)
+        ops = {
+            'model_validate': lambda: cls.model_validate(data),
+            'json.loads+model_validate': lambda: cls.model_validate(json.loads(raw)),
+            'model_validate_json': lambda: cls.model_validate_json(raw),
+            'model_dump': lambda: instance.model_dump(),
+            'model_dump_json': lambda: instance.model_dump_json(),
+        }
+        results[mode] = {op: time_op(func, min_time) for op, func in ops.items()}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark pydantic validation and serialization')
+    parser.add_argument('--shapes', nargs='+', choices=list(SHAPES), default=list(SHAPES))
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per timing run')
+    parser.add_argument('--out', help='optional path to save results as JSON')
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'shape':<18}{'mode':<8}{'operation':<28}{'us/op':>10}{'ops/s':>12}")
+    for name in args.shapes:
+        results[name] = bench_shape(name, args.min_time)
+        for mode, ops in results[name].items():
+            for op, r in ops.items():
+                print(f"{name:<18}{mode:<8}{op:<28}{r['us_per_op']:>10}{r['ops_per_s']:>12}")
+
+    if args.out:
+        meta = {'python': platform.python_version(), 'pydantic': pydantic.VERSION, 'min_time': args.min_time}
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
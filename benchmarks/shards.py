@@ -0,0 +1,80 @@
+# Scan throughput of the Docker student store, in-process vs hash-sharded.
+#
+# Loads the same students into StudentStore and into ShardedStudentStore with
+# 1, 2, 4, ... worker processes and times full scans (find_by_name) and ID
+# ordered pages (k-way merge). Scans should scale with the number of shards
+# up to the number of cores.
+#
+# Usage:
+#   python -m benchmarks.shards --records 200000 --max-shards 8
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from pydantic import BaseModel
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'Docker'))
+
+from shards import ShardedStudentStore  # noqa: E402
+from store import StudentStore  # noqa: E402
+
+
+class Student(BaseModel):
+    name: str
+    father_name: str
+    age: int
+    class_name: str
+
+
+def students(count):
+    return {i: Student(name=f'name{i % 1000}', father_name=f'father{i}', age=5 + i % 15, class_name=f'class {i % 12}')
+            for i in range(1, count + 1)}
+
+
+def per_second(func, min_time):
+    calls, start = 0, time.perf_counter()
+    while True:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return round(calls / elapsed, 2)
+
+
+def measure(store, data, min_time):
+    store.update(data)
+    return {
+        'find_by_name/s': per_second(lambda: store.find_by_name('name7'), min_time),
+        'page(limit=1000)/s': per_second(lambda: store.page(len(data) // 2, 1000), min_time),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan throughput of the in-process vs sharded student store')
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--max-shards', type=int, default=os.cpu_count())
+    parser.add_argument('--min-time', type=float, default=2.0, help='seconds per measurement')
+    parser.add_argument('--out', help='optional path to save results as JSON')
+    args = parser.parse_args()
+
+    data = students(args.records)
+    results = {'in-process': measure(StudentStore(), data, args.min_time)}
+    shards = 1
+    while shards <= args.max_shards:
+        results[f'{shards} shards'] = measure(ShardedStudentStore(Student, shards), data, args.min_time)
+        shards *= 2
+
+    print(f'{args.records} students, {os.cpu_count()} cores')
+    for name, rows in results.items():
+        print(f'{name:<14}' + ''.join(f'{op:>22}{value:>10}' for op, value in rows.items()))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'records': args.records, 'cores': os.cpu_count(), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
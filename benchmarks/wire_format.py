@@ -0,0 +1,88 @@
+# JSON vs MessagePack on the wire (see wire.py in each app).
+#
+#   size       - bytes of one list response per app shape, and per record
+#   encode     - json.dumps vs msgpack.packb of that response
+#   decode     - client side: json.loads vs msgpack.unpackb
+#   ingest     - server side of a bulk write: TypeAdapter.validate_json vs
+#                validate_python(msgpack.unpackb(...)), as ingest.json_body does
+# Times are CPU microseconds per record (time.process_time).
+#
+# Usage:
+#   python -m benchmarks.wire_format --records 10000
+
+import argparse
+import json
+import time
+from typing import List
+
+import msgpack
+from pydantic import TypeAdapter
+
+from benchmarks.datasets import BUILDERS, generate
+from benchmarks.pydantic_models import Admission
+
+
+def cpu_us_per_record(func, records, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        func()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / records * 1e6, 3)
+
+
+def formats(records):
+    rows = {}
+    for app in sorted(BUILDERS):
+        data = generate(app, records)
+        as_json = json.dumps(data).encode()
+        as_msgpack = msgpack.packb(data)
+        rows[app] = {
+            'json_bytes/record': round(len(as_json) / records, 1),
+            'msgpack_bytes/record': round(len(as_msgpack) / records, 1),
+            'size_ratio': round(len(as_msgpack) / len(as_json), 3),
+            'encode_json': cpu_us_per_record(lambda: json.dumps(data).encode(), records),
+            'encode_msgpack': cpu_us_per_record(lambda: msgpack.packb(data), records),
+            'decode_json': cpu_us_per_record(lambda: json.loads(as_json), records),
+            'decode_msgpack': cpu_us_per_record(lambda: msgpack.unpackb(as_msgpack), records),
+        }
+    return rows
+
+
+def ingest(records):
+    bodies = []
+    for student_id, record in generate('post', records).items():
+        record.pop('bmi'), record.pop('verdict')
+        bodies.append({**record, 'id': student_id})
+    as_json = json.dumps(bodies).encode()
+    as_msgpack = msgpack.packb(bodies)
+    adapter = TypeAdapter(List[Admission])
+    return {
+        'validate_json': cpu_us_per_record(lambda: adapter.validate_json(as_json), records),
+        'validate_python(msgpack.unpackb)': cpu_us_per_record(
+            lambda: adapter.validate_python(msgpack.unpackb(as_msgpack)), records),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON and MessagePack payload size and CPU cost')
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--out', help='optional path to save results as JSON')
+    args = parser.parse_args()
+
+    results = {'formats': formats(args.records), 'ingest': ingest(args.records)}
+    for app, row in results['formats'].items():
+        print(f'\n== {app} ({args.records} records, CPU us per record)')
+        for name, value in row.items():
+            print(f'{name:<36}{value:>10}')
+    print('\n== ingest: bulk Admission body (CPU us per record)')
+    for name, value in results['ingest'].items():
+        print(f'{name:<36}{value:>10}')
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'records': args.records, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()